@@ -105,6 +105,7 @@ function setupEventListeners() {
     // Chat and message forms
     elements.chatForm.addEventListener('submit', handleCreateChat);
     elements.messageForm.addEventListener('submit', handleSendMessage);
+    document.getElementById('message-content').addEventListener('input', sendTyping);
 
     // Event delegation
     elements.postsList.addEventListener('click', handlePostClick);
@@ -483,8 +484,8 @@ async function loadComments(postId) {
         });
 
         if (response.ok) {
-            const comments = await response.json();
-            displayComments(comments);
+            const data = await response.json();
+            displayComments(data.results || data);
         }
     } catch (error) {
         console.error('Load comments error:', error);
@@ -581,8 +582,10 @@ function displayChats(chats) {
         const chatElement = document.createElement('div');
         chatElement.className = 'chat';
         const members = chat.members_usernames || [];
+        const unread = chat.unread_count ? ` (${chat.unread_count})` : '';
         chatElement.innerHTML = `
-            <p><strong>${members.map(m => escapeHtml(m)).join(', ')}</strong></p>
+            <p><strong>${members.map(m => escapeHtml(m)).join(', ')}</strong>${unread}</p>
+            <p>${escapeHtml(chat.last_message || '')}</p>
             <button class="view-chat-btn" data-chat-id="${chat.id}">Open Chat</button>
         `;
         elements.chatsList.appendChild(chatElement);
@@ -636,6 +639,7 @@ async function viewChat(chatId) {
             
             // Сначала загружаем историю сообщений
             await loadMessages(chatId);
+            markChatRead(chatId);
             
             // Потом подключаем WebSocket
             startChatWebSocket(chatId);
@@ -645,6 +649,17 @@ async function viewChat(chatId) {
     }
 }
 
+async function markChatRead(chatId) {
+    try {
+        await fetch(`${API_BASE}/chats/${chatId}/read/`, {
+            method: 'POST',
+            headers: { 'Authorization': `Bearer ${state.accessToken}` }
+        });
+    } catch (error) {
+        console.error('Mark read error:', error);
+    }
+}
+
 function handleChatClick(e) {
     const target = e.target;
     if (target.classList.contains('view-chat-btn')) {
@@ -676,7 +691,12 @@ async function loadMessages(chatId) {
         }
 
         if (response.ok) {
-            const messages = await response.json();
+            const data = await response.json();
+            // Handle both windowed and plain list responses
+            const messages = data.results || data || [];
+            syncedMessages = new Map(messages.map(message => [message.id, message]));
+            syncToken = data.sync_token ?? null;
+            syncEtag = null;
             displayMessages(messages);
         }
     } catch (error) {
@@ -701,8 +721,13 @@ function displayMessages(messages) {
         let fileHtml = '';
         if (message.file_url) {
             const safeUrl = encodeURI(message.file_url);
-            fileHtml = `<br><a href="${safeUrl}" target="_blank">📎 View file</a><br>
-                        <img src="${safeUrl}" alt="file" style="max-width: 200px; max-height: 200px;">`;
+            // Previews are 200px at most, so the smallest thumbnail above that is enough
+            const thumbnails = message.thumbnails || {};
+            const preview = thumbnails['480'] || thumbnails['160'];
+            const previewUrl = preview ? encodeURI(preview.url) : safeUrl;
+            const fileName = message.file_name ? escapeHtml(message.file_name) : 'View file';
+            fileHtml = `<br><a href="${safeUrl}" target="_blank">📎 ${fileName}</a><br>
+                        <img src="${previewUrl}" alt="file" loading="lazy" style="max-width: 200px; max-height: 200px;">`;
         }
 
         messageElement.innerHTML = `
@@ -802,6 +827,13 @@ function startChatWebSocket(chatId) {
         state.chatSocket.onmessage = function(e) {
             console.log('📨 Message received:', e.data);
             const message = JSON.parse(e.data);
+            if (message.t === 'typing') {
+                showTyping(message.username);
+                return;
+            }
+            if (message.t === 'read' || message.t === 'presence' || message.error) {
+                return;
+            }
             const messageElement = document.createElement('div');
             messageElement.className = 'message';
             messageElement.innerHTML = `
@@ -810,6 +842,7 @@ function startChatWebSocket(chatId) {
             `;
             elements.messagesList.appendChild(messageElement);
             elements.messagesList.scrollTop = elements.messagesList.scrollHeight;
+            state.chatSocket.send(JSON.stringify({ t: 'read', id: message.id }));
         };
 
         state.chatSocket.onclose = function(e) {
@@ -827,13 +860,71 @@ function startChatWebSocket(chatId) {
         startMessagePolling(chatId);
     }
 }
+// Typing indicator; the server throttles how often it is broadcast
+let typingTimeout;
+
+function sendTyping() {
+    if (state.chatSocket && state.chatSocket.readyState === WebSocket.OPEN) {
+        state.chatSocket.send(JSON.stringify({ t: 'typing' }));
+    }
+}
+
+function showTyping(username) {
+    const title = document.getElementById('chat-title');
+    if (!title.dataset.base) title.dataset.base = title.textContent;
+    title.textContent = `${title.dataset.base} (${username} is typing...)`;
+    clearTimeout(typingTimeout);
+    typingTimeout = setTimeout(() => {
+        title.textContent = title.dataset.base;
+        delete title.dataset.base;
+    }, 4000);
+}
+
 // Polling fallback
 let messagePollingInterval;
 
+// Delta sync state for the open chat
+let syncToken = null;
+let syncEtag = null;
+let syncedMessages = new Map();
+
+async function syncMessages(chatId) {
+    if (syncToken === null) {
+        return loadMessages(chatId);
+    }
+    try {
+        const headers = { 'Authorization': `Bearer ${state.accessToken}` };
+        if (syncEtag) {
+            headers['If-None-Match'] = syncEtag;
+        }
+        const response = await fetch(`${API_BASE}/chats/${chatId}/messages/sync/?since=${syncToken}`, { headers });
+
+        if (response.status === 304) {
+            return;
+        }
+        if (response.status === 401) {
+            if (await refreshAccessToken()) {
+                return syncMessages(chatId);
+            }
+            return;
+        }
+        if (response.ok) {
+            const data = await response.json();
+            data.messages.forEach(message => syncedMessages.set(message.id, message));
+            data.deleted.forEach(id => syncedMessages.delete(id));
+            syncToken = data.sync_token;
+            syncEtag = response.headers.get('ETag');
+            displayMessages([...syncedMessages.values()].sort((a, b) => a.id - b.id));
+        }
+    } catch (error) {
+        console.error('Sync messages error:', error);
+    }
+}
+
 function startMessagePolling(chatId) {
     clearInterval(messagePollingInterval);
     messagePollingInterval = setInterval(() => {
-        loadMessages(chatId);
+        syncMessages(chatId);
     }, 5000);
 }
 
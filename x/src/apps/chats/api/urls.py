@@ -11,4 +11,6 @@ router.register(r'messages', MessageViewSet, basename='message')
 urlpatterns = [
     path('', include(router.urls)),
     path('chats/<int:chat_pk>/messages/', MessageViewSet.as_view({'get': 'list', 'post': 'create'}), name='chat-messages'),
+    path('chats/<int:chat_pk>/messages/sync/', MessageViewSet.as_view({'get': 'sync'}), name='chat-messages-sync'),
+    path('chats/<int:chat_pk>/attachments/', MessageViewSet.as_view({'post': 'presign'}), name='chat-attachments'),
 ]
@@ -1,14 +1,32 @@
 from rest_framework import viewsets, status, mixins
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from ..schemas.chat import ChatSerializer
 from ..services.chat_service import ChatService
-from ..schemas.message import MessageSerializer, MessageCreateSerializer, MessageEditSerializer
+from ..schemas.message import MessageSerializer, MessageCreateSerializer, MessageEditSerializer, AttachmentPresignSerializer
+from ..services.attachment_service import AttachmentService, UploadQueueFull
+from ..services.storage import DirectUploadUnsupported
 from ..services.message_service import MessageService
+from ..services.membership_service import MembershipService
+from ..services.presence_service import PresenceService
 from ..models.message import Message
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from src.common.exceptions import PermissionDeniedException
+
+
+def _int_param(request, name: str) -> int|None:
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: 'Must be an integer.'})
 
 @method_decorator(csrf_exempt, name='dispatch')
 class ChatViewSet(
@@ -21,6 +39,17 @@ class ChatViewSet(
 ):
     serializer_class = ChatSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {
+        'list': 3,
+        'retrieve': 3,
+        'create': 9,
+        'update': 6,
+        'partial_update': 6,
+        'destroy': 7,
+        'read': 5,
+        'presence': 2,
+    }
+    max_presence_ids = 500
     
     def get_queryset(self):
         return ChatService.list_chats_for_user(self.request.user)
@@ -49,6 +78,34 @@ class ChatViewSet(
         if not deleted:
             return Response(status=status.HTTP_404_NOT_FOUND)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'])
+    def read(self, request, pk=None):
+        """Reset the requesting member's unread counter for the chat."""
+        if not ChatService.mark_read(pk, user=request.user):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['get'])
+    def presence(self, request):
+        """
+        Bulk "who is online among these users" lookup: ?ids=1,2,3
+
+        Only users sharing a chat with the caller are reported; other ids are left out.
+        """
+        raw_ids = request.query_params.get('ids', '')
+        try:
+            user_ids = {int(user_id) for user_id in raw_ids.split(',') if user_id.strip()}
+        except ValueError:
+            return Response({'error': 'ids must be a comma-separated list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(user_ids) > self.max_presence_ids:
+            return Response(
+                {'error': f'At most {self.max_presence_ids} ids can be checked at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        visible = PresenceService.visible_user_ids(request.user.id, user_ids)
+        online = PresenceService.online_user_ids(visible)
+        return Response({str(user_id): user_id in online for user_id in sorted(visible)})
     
 @method_decorator(csrf_exempt, name='dispatch')
 class MessageViewSet(
@@ -61,45 +118,160 @@ class MessageViewSet(
 ):
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
-    parser_classes = (MultiPartParser, FormParser)
+    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    query_budget = {
+        'list': 4,
+        'retrieve': 3,
+        'sync': 4,
+        'create': 9,
+        'presign': 2,
+        'update': 9,
+        'partial_update': 9,
+        'destroy': 10,
+    }
+    default_window = 50
+    max_window = 200
     
+    def check_chat_membership(self, chat_id):
+        if not MembershipService.is_member(chat_id, self.request.user.id):
+            raise PermissionDeniedException('You are not a member of this chat.')
+
     def get_queryset(self):
         chat_id = self.kwargs.get('chat_pk') or self.request.query_params.get('chat_id')
         if not chat_id:
             return Message.objects.none()
+        self.check_chat_membership(chat_id)
         return MessageService.get_messages_for_chat(chat_id)
+
+    def list(self, request, *args, **kwargs):
+        """
+        A window of history: the newest messages by default, ``?before=<id>`` for older
+        ones and ``?after=<id>`` for newer ones, ``?limit=`` up to ``max_window``.
+        """
+        chat_id = self.kwargs.get('chat_pk') or request.query_params.get('chat_id')
+        if not chat_id:
+            return Response({'results': [], 'has_more': False, 'previous': None, 'next': None})
+        self.check_chat_membership(chat_id)
+
+        before = _int_param(request, 'before')
+        after = _int_param(request, 'after')
+        limit = _int_param(request, 'limit') or self.default_window
+        limit = max(1, min(limit, self.max_window))
+
+        sync_token = MessageService.get_sync_version(chat_id)
+        messages, has_more = MessageService.get_message_window(chat_id, before=before, after=after, limit=limit)
+
+        url = remove_query_param(remove_query_param(request.build_absolute_uri(), 'before'), 'after')
+        older_exist = has_more if after is None else bool(messages)
+        newer_exist = has_more if after is not None else before is not None
+        return Response({
+            'results': MessageSerializer(messages, many=True).data,
+            'has_more': has_more,
+            'previous': replace_query_param(url, 'before', messages[0].id) if messages and older_exist else None,
+            'next': replace_query_param(url, 'after', messages[-1].id) if messages and newer_exist else None,
+            'sync_token': sync_token,
+        })
+
+    def sync(self, request, *args, **kwargs):
+        """
+        Delta sync: ``?since=<sync_token>`` returns only messages created, edited or
+        deleted after that token, and 304 when ``If-None-Match`` is still current.
+        """
+        chat_id = self.kwargs.get('chat_pk')
+        since = _int_param(request, 'since') or 0
+        self.check_chat_membership(chat_id)
+
+        current = MessageService.get_sync_version(chat_id)
+        if current is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        etag = f'"{chat_id}-{current}"'
+        if request.headers.get('If-None-Match') == etag or since >= current:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
+
+        messages, deleted_ids, sync_token, has_more = MessageService.get_changes_since(chat_id, since)
+        response = Response({
+            'messages': MessageSerializer(messages, many=True).data,
+            'deleted': deleted_ids,
+            'sync_token': sync_token,
+            'has_more': has_more,
+        })
+        if not has_more:
+            response['ETag'] = etag
+        return response
     def create(self, request, *args, **kwargs):
-        print(request.data)
-        print(type(request.data.get('content')))
         chat_id = self.kwargs.get('chat_pk')
         if not chat_id:
             return Response({'error': 'chat_id required'}, status=status.HTTP_400_BAD_REQUEST)
+        self.check_chat_membership(chat_id)
 
         serializer = MessageCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         file = serializer.validated_data.get('file')
+        if file:
+            # The upload runs in the background; the message arrives over the chat socket.
+            try:
+                upload_id, message = MessageService.send_message_with_file(
+                    user=request.user,
+                    content=serializer.validated_data['content'],
+                    chat_id=chat_id,
+                    file=file
+                )
+            except UploadQueueFull:
+                return Response({'error': 'Too many uploads in progress, retry later'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            if message is not None:
+                return Response(MessageSerializer(message).data, status=status.HTTP_201_CREATED)
+            return Response({'upload_id': upload_id, 'status': 'pending'}, status=status.HTTP_202_ACCEPTED)
 
         # Отправляем сообщение через сервис
         message = MessageService.send_message(
             user=request.user,
             content=serializer.validated_data['content'],
             chat_id=chat_id,
-            file=file 
+            attachment_key=serializer.validated_data.get('attachment_key')
         )
         
         return Response(
         MessageSerializer(message).data,
         status=status.HTTP_201_CREATED
     )
+
+    def presign(self, request, *args, **kwargs):
+        """
+        Start a direct upload: returns a presigned PUT URL and the ``key`` to send back
+        as ``attachment_key`` when creating the message.
+        """
+        chat_id = self.kwargs.get('chat_pk')
+        self.check_chat_membership(chat_id)
+        serializer = AttachmentPresignSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            upload = AttachmentService.presign_upload(
+                request.user,
+                int(chat_id),
+                serializer.validated_data['filename'],
+                serializer.validated_data.get('content_type'),
+            )
+        except DirectUploadUnsupported:
+            return Response({'error': 'Direct uploads are not available, send the file with the message'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(upload, status=status.HTTP_201_CREATED)
+
     def update(self, request, *args, **kwargs):
         serializer = MessageEditSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        message = MessageService.edit_message(
-            user=request.user,
-            message_id=kwargs.get('pk'),
-            new_content=serializer.validated_data['content']
-        )
+        try:
+            message = MessageService.edit_message(
+                user=request.user,
+                message_id=kwargs.get('pk'),
+                new_content=serializer.validated_data['content']
+            )
+        except Message.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        except PermissionError:
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         if not message:
             return Response(status=status.HTTP_404_NOT_FOUND)
         return Response(MessageSerializer(message).data)
@@ -107,7 +279,10 @@ class MessageViewSet(
     def destroy(self, request, *args, **kwargs):
         pk = kwargs.get('pk')
         try:
-            deleted = MessageService.remove_message(pk, self.request.user)
-            return Response(status=status.HTTP_204_NO_CONTENT)
+            MessageService.remove_message(pk, self.request.user)
+        except Message.DoesNotExist:
+            # Unknown or already deleted.
+            return Response(status=status.HTTP_404_NOT_FOUND)
         except PermissionError:
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(status=status.HTTP_204_NO_CONTENT)
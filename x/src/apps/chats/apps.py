@@ -4,3 +4,6 @@ class ChatsConfig(AppConfig):
 	default_auto_field = 'django.db.models.BigAutoField'
 	name = 'src.apps.chats'
 	verbose_name = 'Chats'
+
+	def ready(self):
+		from . import signals  # noqa: F401
@@ -1,80 +1,303 @@
-import json
+import asyncio
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
-from .services.message_service import MessageService
-from .models.chat import Chat
+from .protocol import SUBPROTOCOL_MSGPACK, choose_subprotocol, decode_frame, encode_frames
+from .services.chat_events import Throttle, get_read_mark_buffer
+from .services.inbox_notifier import chat_group_name, user_group_name
+from .services.message_pipeline import MessagePipelineFull, get_message_pipeline
+from .services.membership_service import MembershipService
+from .services.presence_service import get_presence_tracker
+
+# Client frames carry their kind in "t"; frames without it are plain messages.
+EVENT_MESSAGE = 'msg'
+EVENT_TYPING = 'typing'
+EVENT_READ = 'read'
+EVENT_SUBSCRIBE = 'sub'
+EVENT_UNSUBSCRIBE = 'unsub'
+# Message IDs are BIGINTs; anything larger cannot be a real message.
+MAX_MESSAGE_ID = 2 ** 63 - 1
+
+class ChatEventsMixin:
+    """Message, typing and read-receipt handling shared by the per-chat and per-user sockets."""
+
+    def init_chat_events(self):
+        self.subprotocol = choose_subprotocol(self.scope.get('subprotocols', []))
+        self.typing_throttle = Throttle(settings.CHAT_TYPING_THROTTLE)
+        self.read_throttle = Throttle(settings.CHAT_READ_THROTTLE)
+        self.last_read_sent = {}
+        self.pending_read = {}
+        self.pending_read_tasks = {}
+
+    def cancel_pending_reads(self):
+        for task in getattr(self, 'pending_read_tasks', {}).values():
+            task.cancel()
+
+    async def handle_event(self, chat_id, data):
+        event = data.get('t', EVENT_MESSAGE)
+
+        if event == EVENT_MESSAGE:
+            await self.receive_message(chat_id, data)
+        elif event == EVENT_TYPING:
+            await self.receive_typing(chat_id)
+        elif event == EVENT_READ:
+            await self.receive_read(chat_id, data)
+
+    async def receive_message(self, chat_id, data):
+        content = data.get('content')
+
+        if not content or not content.strip():
+            return
+
+        try:
+            message_data = await self.create_message(chat_id, content)
+        except MessagePipelineFull:
+            await self.send_frames(encode_frames({"error": "busy", "chat": chat_id, "content": content}))
+            return
+
+        await self.channel_layer.group_send(
+            chat_group_name(chat_id),
+            {
+                "type": "chat_message",
+                "frames": encode_frames(message_data)
+            }
+        )
+
+    async def receive_typing(self, chat_id):
+        # Typing is ephemeral: never stored, and broadcast at most once per throttle window.
+        if not self.typing_throttle.allow((EVENT_TYPING, chat_id)):
+            return
+        user = self.scope["user"]
+        await self.channel_layer.group_send(
+            chat_group_name(chat_id),
+            {
+                "type": "chat_typing",
+                "user_id": user.id,
+                "frames": encode_frames({"t": EVENT_TYPING, "chat": chat_id, "user_id": user.id, "username": user.username}),
+            }
+        )
+
+    async def receive_read(self, chat_id, data):
+        message_id = data.get('id')
+        if not isinstance(message_id, int) or message_id > MAX_MESSAGE_ID:
+            return
+        if message_id <= self.last_read_sent.get(chat_id, 0):
+            return
+        get_read_mark_buffer().mark(chat_id, self.scope["user"].id, message_id)
+
+        self.pending_read[chat_id] = max(self.pending_read.get(chat_id, 0), message_id)
+        key = (EVENT_READ, chat_id)
+        if self.read_throttle.allow(key):
+            await self.send_read(chat_id)
+        elif chat_id not in self.pending_read_tasks:
+            # Trailing edge: announce the newest receipt once the window closes.
+            self.pending_read_tasks[chat_id] = asyncio.create_task(
+                self.send_read_later(chat_id, self.read_throttle.remaining(key))
+            )
+
+    async def send_read_later(self, chat_id, delay):
+        await asyncio.sleep(delay)
+        self.pending_read_tasks.pop(chat_id, None)
+        self.read_throttle.allow((EVENT_READ, chat_id))
+        await self.send_read(chat_id)
+
+    async def send_read(self, chat_id):
+        message_id = self.pending_read.get(chat_id, 0)
+        if message_id <= self.last_read_sent.get(chat_id, 0):
+            return
+        self.last_read_sent[chat_id] = message_id
+        user_id = self.scope["user"].id
+        await self.channel_layer.group_send(
+            chat_group_name(chat_id),
+            {
+                "type": "chat_read",
+                "user_id": user_id,
+                "frames": encode_frames({"t": EVENT_READ, "chat": chat_id, "user_id": user_id, "id": message_id}),
+            }
+        )
+
+    async def create_message(self, chat_id, content):
+        user = self.scope["user"]
+        message = await get_message_pipeline().submit(
+            sender_id=user.id,
+            content=content,
+            chat_id=chat_id
+        )
+
+        return {
+            "id": message.id,
+            "chat": chat_id,
+            "sender_username": user.username,
+            "content": message.content,
+            "timestamp": str(message.timestamp),
+        }
+
+    async def send_frames(self, frames):
+        # Payloads arrive pre-serialized; pick this socket's format without re-encoding.
+        if self.subprotocol == SUBPROTOCOL_MSGPACK:
+            await self.send(bytes_data=frames["packed"])
+        else:
+            await self.send(text_data=frames["text"])
+
+    async def chat_message(self, event):
+        await self.send_frames(event["frames"])
+
+    async def chat_typing(self, event):
+        if event["user_id"] == self.scope["user"].id:
+            return
+        await self.send_frames(event["frames"])
+
+    async def chat_read(self, event):
+        if event["user_id"] == self.scope["user"].id:
+            return
+        await self.send_frames(event["frames"])
+
+    async def chat_presence(self, event):
+        await self.send_frames(event["frames"])
+
+class ChatConsumer(ChatEventsMixin, AsyncWebsocketConsumer):
+    """One socket per chat: ``ws/chat/<chat_id>/``."""
 
-class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         if isinstance(self.scope['user'], AnonymousUser):
             await self.close()
             return
-        
-        self.chat_id = self.scope['url_route']['kwargs']['chat_id']
-        self.room_group_name = f'chat_{self.chat_id}'
-        
+
+        self.chat_id = int(self.scope['url_route']['kwargs']['chat_id'])
+        self.room_group_name = chat_group_name(self.chat_id)
+
         is_member = await self.check_chat_membership()
         if not is_member:
             await self.close()
             return
-        
+
+        self.init_chat_events()
+
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
-        await self.accept()
-    
+        await self.accept(subprotocol=self.subprotocol)
+        await get_presence_tracker().connect(self.channel_name, self.scope['user'].id)
+
     @database_sync_to_async
     def check_chat_membership(self):
-        try:
-            chat = Chat.objects.get(id=self.chat_id)
-            return chat.members.filter(id=self.scope['user'].id).exists()
-        except Chat.DoesNotExist:
-            return False
-    
+        return MembershipService.is_member(self.chat_id, self.scope['user'].id)
+
     async def disconnect(self, close_code):
+        self.cancel_pending_reads()
+        await get_presence_tracker().disconnect(self.channel_name)
         if hasattr(self, 'room_group_name'):
             await self.channel_layer.group_discard(
                 self.room_group_name,
                 self.channel_name
             )
-    
-    async def receive(self, text_data):
+
+    async def receive(self, text_data=None, bytes_data=None):
         try:
-            data = json.loads(text_data)
-            content = data.get('content')
-            
-            if not content or not content.strip():
-                return
-            
-            message_data = await self.create_message(content)
-            
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type": "chat_message",
-                    "message": message_data
-                }
-            )
+            data = decode_frame(self.subprotocol, text_data, bytes_data)
+            await self.handle_event(self.chat_id, data)
         except Exception as e:
             import traceback
             traceback.print_exc()
-    
+
+class UserConsumer(ChatEventsMixin, AsyncWebsocketConsumer):
+    """
+    One socket per user: ``ws/chats/``.
+
+    Joins the groups of the user's most recently active chats on connect, plus the
+    user's own group that announces chats being added or removed. Frames name their
+    chat in ``"chat"``; ``{"t": "sub"|"unsub", "chat": <id>}`` change the subscriptions.
+    """
+
+    async def connect(self):
+        if isinstance(self.scope['user'], AnonymousUser):
+            await self.close()
+            return
+
+        self.init_chat_events()
+        self.user_group_name = user_group_name(self.scope['user'].id)
+        self.chat_ids = set()
+
+        await self.channel_layer.group_add(self.user_group_name, self.channel_name)
+        await self.accept(subprotocol=self.subprotocol)
+        await get_presence_tracker().connect(self.channel_name, self.scope['user'].id)
+
+        chat_ids = await self.get_recent_chat_ids()
+        await asyncio.gather(*(
+            self.channel_layer.group_add(chat_group_name(chat_id), self.channel_name)
+            for chat_id in chat_ids
+        ))
+        self.chat_ids.update(chat_ids)
+        await self.send_frames(encode_frames({"t": "subscribed", "chats": chat_ids}))
+
     @database_sync_to_async
-    def create_message(self, content):
-        message = MessageService.send_message(
-            user=self.scope["user"],
-            content=content,
-            chat_id=self.chat_id
+    def get_recent_chat_ids(self):
+        return MembershipService.recent_chat_ids(self.scope['user'].id, settings.CHAT_SOCKET_MAX_SUBSCRIPTIONS)
+
+    @database_sync_to_async
+    def check_chat_membership(self, chat_id):
+        return MembershipService.is_member(chat_id, self.scope['user'].id)
+
+    async def disconnect(self, close_code):
+        self.cancel_pending_reads()
+        await get_presence_tracker().disconnect(self.channel_name)
+        if not hasattr(self, 'user_group_name'):
+            return
+        await asyncio.gather(
+            self.channel_layer.group_discard(self.user_group_name, self.channel_name),
+            *(self.channel_layer.group_discard(chat_group_name(chat_id), self.channel_name) for chat_id in self.chat_ids),
         )
-        
-        return {
-            "id": message.id,
-            "sender_username": message.sender.username,  
-            "content": message.content,
-            "timestamp": str(message.timestamp),
-        }
-    
-    async def chat_message(self, event):
-        await self.send(text_data=json.dumps(event["message"]))
\ No newline at end of file
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = decode_frame(self.subprotocol, text_data, bytes_data)
+            chat_id = data.get('chat')
+            if not isinstance(chat_id, int):
+                return
+            event = data.get('t', EVENT_MESSAGE)
+
+            if event == EVENT_SUBSCRIBE:
+                await self.subscribe(chat_id)
+            elif event == EVENT_UNSUBSCRIBE:
+                await self.unsubscribe(chat_id)
+            elif chat_id in self.chat_ids:
+                await self.handle_event(chat_id, data)
+            else:
+                await self.send_frames(encode_frames({"error": "not_subscribed", "chat": chat_id}))
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+
+    async def subscribe(self, chat_id, check_membership=True):
+        if chat_id in self.chat_ids:
+            return
+        if len(self.chat_ids) >= settings.CHAT_SOCKET_MAX_SUBSCRIPTIONS:
+            await self.send_frames(encode_frames({"error": "too_many_subscriptions", "chat": chat_id}))
+            return
+        if check_membership and not await self.check_chat_membership(chat_id):
+            await self.send_frames(encode_frames({"error": "forbidden", "chat": chat_id}))
+            return
+        await self.channel_layer.group_add(chat_group_name(chat_id), self.channel_name)
+        self.chat_ids.add(chat_id)
+        await self.send_frames(encode_frames({"t": "subscribed", "chats": [chat_id]}))
+
+    async def unsubscribe(self, chat_id):
+        if chat_id not in self.chat_ids:
+            return
+        self.chat_ids.discard(chat_id)
+        await self.channel_layer.group_discard(chat_group_name(chat_id), self.channel_name)
+        await self.send_frames(encode_frames({"t": "unsubscribed", "chats": [chat_id]}))
+
+    async def inbox_chat_added(self, event):
+        await self.send_frames(event["frames"])
+        # Sent only to the chat's members, so membership is already known.
+        await self.subscribe(event["chat"], check_membership=False)
+
+    async def inbox_upload_failed(self, event):
+        await self.send_frames(event["frames"])
+
+    async def inbox_chat_removed(self, event):
+        await self.send_frames(event["frames"])
+        await self.unsubscribe(event["chat"])
@@ -0,0 +1,117 @@
+"""
+Image previews for attachments: size-bucketed thumbnails and blurhash placeholders.
+
+Runs inside worker processes, so it only depends on Pillow and takes plain arguments.
+"""
+import io
+import math
+import os
+
+from PIL import Image, ImageOps
+
+THUMBNAIL_FORMAT = 'WEBP'
+THUMBNAIL_CONTENT_TYPE = 'image/webp'
+THUMBNAIL_QUALITY = 80
+BLURHASH_SAMPLE_SIZE = 32
+BLURHASH_COMPONENTS = (4, 3)
+
+_BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def lower_priority() -> None:
+    """Worker initializer: yield the CPU to request-serving processes."""
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+
+def render_previews(path: str, sizes: tuple[int, ...]) -> dict:
+    """
+    Thumbnails no larger than each of ``sizes`` on the long edge (only those smaller than
+    the original) and a blurhash of the image.
+
+    Returns ``{'thumbnails': [(size, data, width, height), ...], 'blurhash': str,
+    'width': int, 'height': int}``.
+    """
+    with Image.open(path) as image:
+        # Let JPEG decode straight at reduced scale when only small outputs are needed.
+        image.draft('RGB', (max(sizes), max(sizes)))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        width, height = image.size
+
+        thumbnails = []
+        for size in sorted(sizes):
+            if size >= max(width, height):
+                break
+            thumbnail = image.copy()
+            thumbnail.thumbnail((size, size), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+            thumbnails.append((size, buffer.getvalue(), *thumbnail.size))
+
+        sample = image.resize((BLURHASH_SAMPLE_SIZE, BLURHASH_SAMPLE_SIZE), Image.Resampling.BILINEAR)
+        return {
+            'thumbnails': thumbnails,
+            'blurhash': blurhash(sample, *BLURHASH_COMPONENTS),
+            'width': width,
+            'height': height,
+        }
+
+
+def blurhash(image: Image.Image, x_components: int, y_components: int) -> str:
+    """Encode an RGB image as a blurhash string (https://blurha.sh)."""
+    width, height = image.size
+    pixels = [tuple(_srgb_to_linear(c) for c in pixel) for pixel in image.getdata()]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            normalisation = 1 if i == 0 and j == 0 else 2
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                for x in range(width):
+                    basis = cos_x[i][x] * cos_y[j][y]
+                    pr, pg, pb = pixels[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = normalisation / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised_max = max(0, min(82, math.floor(actual_max * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+    else:
+        quantised_max, max_value = 0, 1
+    result += _base83(quantised_max, 1)
+    result += _base83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (
+            max(0, min(18, math.floor(math.copysign(abs(value / max_value) ** 0.5, value) * 9 + 9.5)))
+            for value in factor
+        )
+        result += _base83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def _srgb_to_linear(value: int) -> float:
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value: float) -> int:
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _base83(value: int, length: int) -> str:
+    return ''.join(_BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
@@ -1,25 +1,43 @@
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from urllib.parse import parse_qs
+from rest_framework_simplejwt.models import TokenUser
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import TokenError
 
 User = get_user_model()
 
 @database_sync_to_async
-def get_user_from_token(token_key):
+def get_user_by_id(user_id):
+    key = f'ws_user:{user_id}'
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.filter(id=user_id, is_active=True).first()
+        if user is None:
+            return AnonymousUser()
+        cache.set(key, user, settings.WS_AUTH_USER_CACHE_TTL)
+    return user
+
+async def get_user_from_token(token_key):
+    """
+    Validate the token in-process and build the principal from its claims.
+
+    Only tokens issued before the ``username`` claim existed (or with
+    ``WS_AUTH_STATELESS`` off) fall back to a cached database lookup.
+    """
     try:
         access_token = AccessToken(token_key)
-        user_id = access_token['user_id']
-        user = User.objects.get(id=user_id)
-        return user
-    except TokenError as e:
-        return AnonymousUser()
-    except User.DoesNotExist:
+    except TokenError:
         return AnonymousUser()
 
+    if settings.WS_AUTH_STATELESS and 'username' in access_token:
+        return TokenUser(access_token)
+    return await get_user_by_id(access_token['user_id'])
+
 class JWTAuthMiddleware(BaseMiddleware):
     async def __call__(self, scope, receive, send):
         query_string = scope.get('query_string', b'').decode()
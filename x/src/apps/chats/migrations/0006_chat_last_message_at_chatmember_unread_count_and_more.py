@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-18 17:12
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_inbox(apps, schema_editor):
+    Chat = apps.get_model('chats', 'Chat')
+    Message = apps.get_model('chats', 'Message')
+
+    latest = Message.objects.filter(chat=OuterRef('pk'), is_deleted=False).order_by('-id')
+    Chat.objects.update(
+        last_message=Coalesce(Subquery(latest.values('content')[:1]), models.Value('')),
+        last_message_at=Coalesce(Subquery(latest.values('timestamp')[:1]), 'timestamp'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0005_chat_sync_version_message_edited_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='last_message_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='chatmember',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['-last_message_at', '-id'], name='chat_last_activity_idx'),
+        ),
+        migrations.RunPython(backfill_inbox, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0006_chat_last_message_at_chatmember_unread_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmember',
+            name='last_read_message_id',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
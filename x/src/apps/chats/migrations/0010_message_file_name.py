@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 21:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0009_message_thumbnails_message_blurhash_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='file_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
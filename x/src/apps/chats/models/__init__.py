@@ -0,0 +1,8 @@
+"""
+Models package
+"""
+from .chat import Chat, ChatMember
+from .message import Message
+from .attachment import AttachmentBlob
+
+__all__ = ['Chat', 'ChatMember', 'Message', 'AttachmentBlob']
@@ -0,0 +1,21 @@
+from django.db import models
+
+
+class AttachmentBlob(models.Model):
+    """One stored object per distinct file content, so identical uploads share it."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    key = models.CharField(max_length=512)
+    size = models.BigIntegerField()
+    content_type = models.CharField(max_length=255, blank=True)
+    # Previews generated once per content and copied onto every message using it.
+    thumbnails = models.JSONField(default=dict, blank=True)
+    blurhash = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256} -> {self.key}"
+
+    class Meta:
+        verbose_name = 'Attachment blob'
+        verbose_name_plural = 'Attachment blobs'
+        db_table = 'attachment_blobs'
@@ -1,9 +1,14 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class ChatMember(models.Model):
     chat = models.ForeignKey('Chat', on_delete=models.CASCADE)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Messages from other members since this member last read the chat.
+    unread_count = models.PositiveIntegerField(default=0)
+    # Highest message ID the member has read in this chat.
+    last_read_message_id = models.BigIntegerField(default=0)
 
     class Meta:
         unique_together = ('chat', 'user')
@@ -12,7 +17,11 @@ class ChatMember(models.Model):
 class Chat(models.Model):
     members = models.ManyToManyField(settings.AUTH_USER_MODEL, through='ChatMember')
     last_message = models.TextField(blank=True)
+    # Time of the newest message, or of creation for an empty chat; orders the inbox.
+    last_message_at = models.DateTimeField(default=timezone.now)
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Bumped on every message create/edit/delete; drives delta sync and ETags.
+    sync_version = models.BigIntegerField(default=0)
 
     def __str__(self):
         return f"{self.members.first()} and {self.members.last()}"
@@ -21,3 +30,6 @@ class Chat(models.Model):
         verbose_name = 'Chat'
         verbose_name_plural = 'Chats'
         db_table = 'chats'
+        indexes = [
+            models.Index(fields=['-last_message_at', '-id'], name='chat_last_activity_idx'),
+        ]
@@ -6,7 +6,16 @@ class Message(models.Model):
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     content = models.TextField()
     file_url = models.URLField(blank=True, null=True)
+    # Name the sender gave the attachment; the stored object is shared by identical files.
+    file_name = models.CharField(max_length=255, blank=True)
+    # Image attachments only: {"<size>": {"url", "width", "height"}} and a blurhash placeholder.
+    thumbnails = models.JSONField(default=dict, blank=True)
+    blurhash = models.CharField(max_length=64, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    edited_at = models.DateTimeField(blank=True, null=True)
+    is_deleted = models.BooleanField(default=False)
+    # Chat.sync_version at the time of the last change to this message.
+    version = models.BigIntegerField(default=0)
 
     def __str__(self):
         return f"Message from {self.sender} at {self.timestamp}"
@@ -15,4 +24,8 @@ class Message(models.Model):
         ordering = ['timestamp']
         verbose_name = 'Message'
         verbose_name_plural = 'Messages'
-        db_table = 'messages'
\ No newline at end of file
+        db_table = 'messages'
+        indexes = [
+            models.Index(fields=['chat', 'id'], name='message_chat_id_idx'),
+            models.Index(fields=['chat', 'version'], name='message_chat_version_idx'),
+        ]
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+Wire formats of the chat WebSocket.
+
+Clients pick one through the WebSocket subprotocol: ``chat.msgpack.v1`` exchanges
+msgpack binary frames, anything else (including no subprotocol) compact JSON text
+frames. Broadcast payloads are encoded once per ``group_send`` in every format, so
+each recipient socket only forwards ready-made bytes.
+"""
+import json
+
+import msgpack
+
+SUBPROTOCOL_MSGPACK = 'chat.msgpack.v1'
+SUBPROTOCOL_JSON = 'chat.json.v1'
+SUPPORTED_SUBPROTOCOLS = (SUBPROTOCOL_MSGPACK, SUBPROTOCOL_JSON)
+
+
+def choose_subprotocol(offered: list[str]) -> str|None:
+    """The first subprotocol the client offered that the server speaks."""
+    for subprotocol in offered:
+        if subprotocol in SUPPORTED_SUBPROTOCOLS:
+            return subprotocol
+    return None
+
+
+def encode_frames(payload: dict) -> dict:
+    """Serialize ``payload`` in every wire format, for embedding into a channel layer event."""
+    return {
+        'text': json.dumps(payload, separators=(',', ':'), ensure_ascii=False),
+        'packed': msgpack.packb(payload, use_bin_type=True),
+    }
+
+
+def decode_frame(subprotocol: str|None, text_data: str|None = None, bytes_data: bytes|None = None) -> dict:
+    if bytes_data is not None and subprotocol == SUBPROTOCOL_MSGPACK:
+        data = msgpack.unpackb(bytes_data, raw=False)
+    else:
+        data = json.loads(text_data)
+    if not isinstance(data, dict):
+        raise ValueError('Frame must be an object')
+    return data
@@ -0,0 +1,22 @@
+from django.db import IntegrityError, transaction
+
+from ..models.attachment import AttachmentBlob
+
+
+class AttachmentBlobRepository:
+    @staticmethod
+    def get_by_hash(sha256: str) -> AttachmentBlob|None:
+        return AttachmentBlob.objects.filter(sha256=sha256).first()
+
+    @staticmethod
+    def record(*, sha256: str, key: str, size: int, content_type: str = '',
+               thumbnails: dict|None = None, blurhash: str = '') -> AttachmentBlob:
+        """Index an uploaded object; if the same content was indexed concurrently, keep that entry."""
+        try:
+            with transaction.atomic():
+                return AttachmentBlob.objects.create(
+                    sha256=sha256, key=key, size=size, content_type=content_type,
+                    thumbnails=thumbnails or {}, blurhash=blurhash,
+                )
+        except IntegrityError:
+            return AttachmentBlob.objects.get(sha256=sha256)
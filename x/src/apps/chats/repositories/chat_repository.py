@@ -1,18 +1,37 @@
+from __future__ import annotations
+
+from collections import Counter
 from typing import Any
 
-from ..models.chat import Chat
+from django.core.cache import cache
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import Count, F, Max, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+
+from ..models.chat import Chat, ChatMember
+from ..models.message import Message
 from src.apps.users.models.user import User
 
+MEMBERS_CACHE_TTL = 3600
+LAST_MESSAGE_PREVIEW_LENGTH = 200
+
+
+def _members_cache_key(chat_id) -> str:
+    return f'chat:{chat_id}:members'
+
 
 class ChatRepository:
     @staticmethod
     def list(filters: dict[str, Any] = None, user=None):
-        qs = Chat.objects.all()
+        qs = Chat.objects.prefetch_related(
+            Prefetch('members', queryset=User.objects.only('id', 'username')),
+        )
         if user:
-            qs = qs.filter(members=user)
+            unread = ChatMember.objects.filter(chat=OuterRef('pk'), user=user).values('unread_count')[:1]
+            qs = qs.filter(members=user).annotate(unread_count=Subquery(unread))
         if filters:
             qs = qs.filter(**filters)
-        return qs
+        return qs.order_by('-last_message_at', '-id')
 
     @staticmethod
     def get(user1: User, user2: User) -> Chat|None:
@@ -25,12 +44,151 @@ class ChatRepository:
     def create(*, data: dict[str, Any], members) -> Chat:
         chat = Chat.objects.create(**data)
         chat.members.set(members)
+        ChatRepository.invalidate_members(chat.pk)
         return chat
 
     @staticmethod
     def delete(user, instance: Chat) -> None:
+        pk = instance.pk
         instance.delete()
+        ChatRepository.invalidate_members(pk)
+
+    @staticmethod
+    def get_member_ids(chat_id) -> frozenset[int]:
+        """Member IDs of a chat, served from cache; empty for a chat that doesn't exist."""
+        key = _members_cache_key(chat_id)
+        member_ids = cache.get(key)
+        if member_ids is None:
+            member_ids = frozenset(ChatMember.objects.filter(chat_id=chat_id).values_list('user_id', flat=True))
+            cache.set(key, member_ids, MEMBERS_CACHE_TTL)
+        return member_ids
+
+    @staticmethod
+    def recent_chat_ids(user_id: int, limit: int) -> list[int]:
+        """IDs of the user's chats, most recently active first."""
+        return list(
+            ChatMember.objects.filter(user_id=user_id)
+            .order_by('-chat__last_message_at', '-chat_id')
+            .values_list('chat_id', flat=True)[:limit]
+        )
+
+    @staticmethod
+    def chat_ids_by_user(user_ids) -> list[tuple[int, int]]:
+        """``(user_id, chat_id)`` pairs for every chat of the given users."""
+        return list(ChatMember.objects.filter(user_id__in=user_ids).values_list('user_id', 'chat_id'))
+
+    @staticmethod
+    def co_member_ids(user_id: int, user_ids) -> set[int]:
+        """Those of ``user_ids`` that share at least one chat with ``user_id``, plus ``user_id`` itself."""
+        shared = ChatMember.objects.filter(
+            user_id__in=user_ids,
+            chat_id__in=ChatMember.objects.filter(user_id=user_id).values('chat_id'),
+        )
+        visible = set(shared.values_list('user_id', flat=True).distinct())
+        return visible | ({user_id} & set(user_ids))
+
+    @staticmethod
+    def invalidate_members(chat_id) -> None:
+        cache.delete(_members_cache_key(chat_id))
+        transaction.on_commit(lambda: cache.delete(_members_cache_key(chat_id)))
 
     @staticmethod
     def get_by_id(pk):
         return Chat.objects.filter(id=pk).first()
+
+    @staticmethod
+    def next_sync_version(chat_id: int) -> int:
+        """Bump and return the chat's sync version; the row stays locked until the caller commits."""
+        return ChatRepository.reserve_sync_versions(chat_id, 1)
+
+    @staticmethod
+    def reserve_sync_versions(chat_id: int, count: int) -> int:
+        """Advance the sync version by ``count`` and return the last reserved version."""
+        with transaction.atomic():
+            Chat.objects.filter(pk=chat_id).update(sync_version=F('sync_version') + count)
+            return Chat.objects.filter(pk=chat_id).values_list('sync_version', flat=True).get()
+
+    @staticmethod
+    def record_messages(chat_id: int, last_message, sent_by: Counter) -> None:
+        """
+        Move the inbox forward after new messages: preview and activity time from
+        ``last_message``, and unread counters of every member but the sender, by the
+        number of messages each sender in ``sent_by`` posted.
+        """
+        with transaction.atomic():
+            ChatRepository.set_last_message(chat_id, last_message)
+            # Each member gains every message except their own.
+            for sender_id, count in sent_by.items():
+                ChatMember.objects.filter(chat_id=chat_id).exclude(user_id=sender_id).update(
+                    unread_count=F('unread_count') + count,
+                )
+
+    @staticmethod
+    def set_last_message(chat_id: int, message) -> None:
+        """Point the inbox preview at ``message``; ``None`` clears the preview."""
+        if message is None:
+            Chat.objects.filter(pk=chat_id).update(last_message='')
+            return
+        Chat.objects.filter(pk=chat_id).update(
+            last_message=message.content[:LAST_MESSAGE_PREVIEW_LENGTH],
+            last_message_at=message.timestamp,
+        )
+
+    @staticmethod
+    def mark_read(chat_id: int, user_id: int) -> None:
+        """Mark everything currently in the chat as read."""
+        latest = Message.objects.filter(chat_id=chat_id).aggregate(latest=Max('id'))['latest']
+        # The mark recounts what is unread past it, so a message committed meanwhile stays counted.
+        ChatRepository.save_read_marks({(chat_id, user_id): latest or 0})
+
+    @staticmethod
+    def unrecord_message(message) -> None:
+        """Take a removed message out of the unread counters of members who had not read it yet."""
+        ChatMember.objects.filter(
+            chat_id=message.chat_id, last_read_message_id__lt=message.id, unread_count__gt=0,
+        ).exclude(user_id=message.sender_id).update(unread_count=F('unread_count') - 1)
+
+    @staticmethod
+    def save_read_marks(marks: dict[tuple[int, int], int]) -> set[tuple[int, int]]:
+        """
+        Advance read high-water marks, ``{(chat_id, user_id): message_id}``, and recount
+        what is left unread past them. Marks never move backwards, nor past the newest
+        message of their chat. Each mark is written in its own savepoint, so one the
+        database rejects does not roll back the others; their keys are returned.
+        """
+        latest = dict(
+            Message.objects.filter(chat_id__in={chat_id for chat_id, _ in marks})
+            .order_by()
+            .values('chat')
+            .annotate(latest=Max('id'))
+            .values_list('chat', 'latest')
+        )
+        rejected = set()
+        with transaction.atomic():
+            for (chat_id, user_id), message_id in sorted(marks.items()):
+                message_id = min(message_id, latest.get(chat_id, 0))
+                if message_id <= 0:
+                    continue
+                unread = (
+                    Message.objects.filter(chat_id=chat_id, id__gt=message_id, is_deleted=False)
+                    .exclude(sender_id=user_id)
+                    .order_by()
+                    .values('chat')
+                    .annotate(c=Count('*'))
+                    .values('c')
+                )
+                try:
+                    with transaction.atomic():
+                        ChatMember.objects.filter(
+                            chat_id=chat_id, user_id=user_id, last_read_message_id__lt=message_id,
+                        ).update(
+                            last_read_message_id=message_id,
+                            unread_count=Coalesce(Subquery(unread), 0),
+                        )
+                except (DataError, IntegrityError):
+                    rejected.add((chat_id, user_id))
+        return rejected
+
+    @staticmethod
+    def get_sync_version(chat_id: int) -> int|None:
+        return Chat.objects.filter(pk=chat_id).values_list('sync_version', flat=True).first()
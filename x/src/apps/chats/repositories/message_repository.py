@@ -1,28 +1,126 @@
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
 from ..models.message import Message
+from .chat_repository import ChatRepository
 
 class MessageRepository:
     @staticmethod
     def get_message_by_id(message_id: int) -> Message:
-        return Message.objects.get(id=message_id)
+        return Message.objects.get(id=message_id, is_deleted=False)
     
     @staticmethod
-    def create_message(content: str, sender_id: int, chat_id: int, file_url: str|None = None) -> Message:
-        message = Message(content=content, file_url=file_url, sender_id=sender_id, chat_id=chat_id)
+    @transaction.atomic
+    def create_message(content: str, sender_id: int, chat_id: int, file_url: str|None = None, file_name: str = '',
+                       thumbnails: dict|None = None, blurhash: str = '') -> Message:
+        version = ChatRepository.next_sync_version(chat_id)
+        message = Message(
+            content=content, file_url=file_url, file_name=file_name, sender_id=sender_id, chat_id=chat_id, version=version,
+            thumbnails=thumbnails or {}, blurhash=blurhash,
+        )
         message.save()
+        ChatRepository.record_messages(chat_id, message, Counter({sender_id: 1}))
         return message
     
     @staticmethod
+    @transaction.atomic
+    def bulk_create_messages(entries: list[dict]) -> list[Message]:
+        """Insert many messages in one statement, reserving sync versions per chat up front."""
+        next_version = {}
+        # Lock chats in a stable order so concurrent batches can't deadlock.
+        for chat_id, count in sorted(Counter(entry['chat_id'] for entry in entries).items()):
+            next_version[chat_id] = ChatRepository.reserve_sync_versions(chat_id, count) - count + 1
+        messages = []
+        for entry in entries:
+            version = next_version[entry['chat_id']]
+            next_version[entry['chat_id']] += 1
+            messages.append(Message(
+                content=entry['content'],
+                file_url=entry.get('file_url'),
+                sender_id=entry['sender_id'],
+                chat_id=entry['chat_id'],
+                version=version,
+            ))
+        messages = Message.objects.bulk_create(messages)
+
+        by_chat = {}
+        for message in messages:
+            by_chat.setdefault(message.chat_id, []).append(message)
+        for chat_id in sorted(by_chat):
+            chat_messages = by_chat[chat_id]
+            sent_by = Counter(message.sender_id for message in chat_messages)
+            ChatRepository.record_messages(chat_id, chat_messages[-1], sent_by)
+        return messages
+
+    @staticmethod
+    @transaction.atomic
     def delete_message(message_id: int) -> None:
+        # Soft delete so that syncing clients learn about the removal.
         message = MessageRepository.get_message_by_id(message_id)
-        message.delete()
+        message.is_deleted = True
+        message.content = ''
+        message.file_url = None
+        message.file_name = ''
+        message.thumbnails = {}
+        message.blurhash = ''
+        message.version = ChatRepository.next_sync_version(message.chat_id)
+        message.save(update_fields=['is_deleted', 'content', 'file_url', 'file_name', 'thumbnails', 'blurhash', 'version'])
+        ChatRepository.unrecord_message(message)
+        if MessageRepository.is_latest(message):
+            ChatRepository.set_last_message(message.chat_id, MessageRepository.get_latest(message.chat_id))
       
     @staticmethod
+    @transaction.atomic
     def update_message(message_id: int, new_content: str) -> Message:
         message = MessageRepository.get_message_by_id(message_id)
         message.content = new_content
-        message.save()
+        message.edited_at = timezone.now()
+        message.version = ChatRepository.next_sync_version(message.chat_id)
+        message.save(update_fields=['content', 'edited_at', 'version'])
+        if MessageRepository.is_latest(message):
+            ChatRepository.set_last_message(message.chat_id, message)
         return message
+
+    @staticmethod
+    def is_latest(message: Message) -> bool:
+        """Whether no live message follows ``message``, i.e. it backs the inbox preview."""
+        return not Message.objects.filter(chat_id=message.chat_id, id__gt=message.id, is_deleted=False).exists()
+
+    @staticmethod
+    def get_latest(chat_id: int) -> Message|None:
+        return Message.objects.filter(chat_id=chat_id, is_deleted=False).order_by('-id').first()
     
     @staticmethod
     def list_messages_by_chat(chat_id: int) -> list[Message]:
-        return Message.objects.filter(chat_id=chat_id).order_by('timestamp').all()
\ No newline at end of file
+        return Message.objects.filter(chat_id=chat_id, is_deleted=False).select_related('sender').order_by('timestamp').all()
+
+    @staticmethod
+    def list_message_window(chat_id: int, before: int|None = None, after: int|None = None, limit: int = 50) -> tuple[list[Message], bool]:
+        """
+        Up to ``limit`` messages in chronological order, walking the ``(chat_id, id)`` index.
+
+        Without a cursor the newest messages are returned. The flag tells whether more
+        messages exist beyond the window in the direction being read.
+        """
+        qs = Message.objects.filter(chat_id=chat_id, is_deleted=False).select_related('sender')
+        if after is not None:
+            messages = list(qs.filter(id__gt=after).order_by('id')[:limit + 1])
+            return messages[:limit], len(messages) > limit
+        if before is not None:
+            qs = qs.filter(id__lt=before)
+        messages = list(qs.order_by('-id')[:limit + 1])
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        messages.reverse()
+        return messages, has_more
+
+    @staticmethod
+    def list_changes_since(chat_id: int, version: int, limit: int) -> list[Message]:
+        """Messages created, edited or deleted after ``version``, oldest change first."""
+        return list(
+            Message.objects.filter(chat_id=chat_id, version__gt=version)
+            .select_related('sender')
+            .order_by('version')[:limit]
+        )
\ No newline at end of file
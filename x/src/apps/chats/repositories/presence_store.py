@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+
+
+class InMemoryPresenceStore:
+    """Process-local stand-in for the Redis store, used in tests and local development."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections: dict[int, dict[str, float]] = defaultdict(dict)
+        self._announced: dict[int, float] = {}
+
+    def touch(self, entries: list[tuple[int, str]], ttl: int) -> None:
+        expires = time.time() + ttl
+        with self._lock:
+            for user_id, connection_id in entries:
+                self._connections[user_id][connection_id] = expires
+                if user_id in self._announced:
+                    self._announced[user_id] = max(self._announced[user_id], expires)
+
+    def remove(self, user_id: int, connection_id: str) -> None:
+        with self._lock:
+            connections = self._connections.get(user_id)
+            if connections is None:
+                return
+            connections.pop(connection_id, None)
+            if not connections:
+                del self._connections[user_id]
+
+    def online(self, user_ids) -> set[int]:
+        now = time.time()
+        with self._lock:
+            return {user_id for user_id in user_ids if self._is_live(user_id, now)}
+
+    def claim_online(self, user_ids, ttl: int) -> set[int]:
+        now = time.time()
+        with self._lock:
+            claimed = set()
+            for user_id in user_ids:
+                if user_id not in self._announced and self._is_live(user_id, now):
+                    self._announced[user_id] = now + ttl
+                    claimed.add(user_id)
+            return claimed
+
+    def claim_offline(self, user_ids) -> set[int]:
+        now = time.time()
+        with self._lock:
+            claimed = set()
+            for user_id in user_ids:
+                if user_id in self._announced and not self._is_live(user_id, now):
+                    del self._announced[user_id]
+                    claimed.add(user_id)
+            return claimed
+
+    def lapsed(self) -> set[int]:
+        now = time.time()
+        with self._lock:
+            return {user_id for user_id, expires in self._announced.items() if expires <= now}
+
+    def _is_live(self, user_id: int, now: float) -> bool:
+        return any(expires > now for expires in self._connections.get(user_id, {}).values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connections.clear()
+            self._announced.clear()
+
+
+class RedisPresenceStore:
+    """
+    One sorted set per user holding their live connections, scored by expiry time.
+
+    A user is online while any connection's score is in the future. Heartbeats push the
+    scores forward for all of a process's sockets in one pipeline; a crashed process's
+    connections simply age out.
+
+    ``presence:announced`` holds the users last announced as online, scored by their
+    latest expiry. Transitions are claimed by scripts that check the user's connections
+    and flip the announced state atomically, so exactly one worker announces each one.
+    Users left behind by a crashed worker show up in ``lapsed()`` for whoever sweeps next.
+    """
+
+    ANNOUNCED_KEY = 'presence:announced'
+
+    # KEYS: announced set, then one connection set per user; ARGV: now, expiry, user IDs.
+    CLAIM_ONLINE_SCRIPT = """
+    local claimed = {}
+    for i = 2, #KEYS do
+        local user_id = ARGV[i + 1]
+        if redis.call('ZCOUNT', KEYS[i], '(' .. ARGV[1], '+inf') > 0
+                and redis.call('ZADD', KEYS[1], 'NX', ARGV[2], user_id) == 1 then
+            table.insert(claimed, user_id)
+        end
+    end
+    return claimed
+    """
+
+    # KEYS: announced set, then one connection set per user; ARGV: now, user IDs.
+    CLAIM_OFFLINE_SCRIPT = """
+    local claimed = {}
+    for i = 2, #KEYS do
+        local user_id = ARGV[i]
+        if redis.call('ZCOUNT', KEYS[i], '(' .. ARGV[1], '+inf') == 0
+                and redis.call('ZREM', KEYS[1], user_id) == 1 then
+            table.insert(claimed, user_id)
+        end
+    end
+    return claimed
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self._claim_online = self.client.register_script(self.CLAIM_ONLINE_SCRIPT)
+        self._claim_offline = self.client.register_script(self.CLAIM_OFFLINE_SCRIPT)
+
+    @staticmethod
+    def key(user_id: int) -> str:
+        return f'presence:{user_id}'
+
+    def touch(self, entries: list[tuple[int, str]], ttl: int) -> None:
+        expires = time.time() + ttl
+        pipe = self.client.pipeline(transaction=False)
+        for user_id, connection_id in entries:
+            key = self.key(user_id)
+            pipe.zadd(key, {connection_id: expires})
+            pipe.expire(key, ttl)
+            pipe.zadd(self.ANNOUNCED_KEY, {user_id: expires}, xx=True, gt=True)
+        pipe.execute()
+
+    def remove(self, user_id: int, connection_id: str) -> None:
+        key = self.key(user_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrem(key, connection_id)
+        pipe.zremrangebyscore(key, '-inf', time.time())
+        pipe.execute()
+
+    def online(self, user_ids) -> set[int]:
+        user_ids = list(user_ids)
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.zcount(self.key(user_id), f'({now}', '+inf')
+        counts = pipe.execute()
+        return {user_id for user_id, count in zip(user_ids, counts) if count}
+
+    def claim_online(self, user_ids, ttl: int) -> set[int]:
+        """Of ``user_ids``, those that are live and were not announced yet; marks them announced."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return set()
+        now = time.time()
+        claimed = self._claim_online(
+            keys=[self.ANNOUNCED_KEY, *(self.key(user_id) for user_id in user_ids)],
+            args=[now, now + ttl, *user_ids],
+        )
+        return {int(user_id) for user_id in claimed}
+
+    def claim_offline(self, user_ids) -> set[int]:
+        """Of ``user_ids``, those announced but no longer live; clears their announcement."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return set()
+        claimed = self._claim_offline(
+            keys=[self.ANNOUNCED_KEY, *(self.key(user_id) for user_id in user_ids)],
+            args=[time.time(), *user_ids],
+        )
+        return {int(user_id) for user_id in claimed}
+
+    def lapsed(self) -> set[int]:
+        return {int(user_id) for user_id in self.client.zrangebyscore(self.ANNOUNCED_KEY, '-inf', time.time())}
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match='presence:*'):
+            self.client.delete(key)
+
+
+@lru_cache(maxsize=None)
+def get_presence_store():
+    if settings.PRESENCE_BACKEND == 'redis':
+        return RedisPresenceStore(settings.PRESENCE_REDIS_URL)
+    return InMemoryPresenceStore()
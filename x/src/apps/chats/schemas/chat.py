@@ -5,14 +5,19 @@ from ..models.chat import Chat
 class ChatSerializer(serializers.ModelSerializer):
     members = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
     members_usernames = serializers.SerializerMethodField()
+    unread_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Chat
-        fields = ['id', 'members', 'members_usernames', 'timestamp']
+        fields = ['id', 'members', 'members_usernames', 'last_message', 'last_message_at', 'unread_count', 'timestamp']
 
     def get_members_usernames(self, obj):
         return [member.username for member in obj.members.all()]
 
+    def get_unread_count(self, obj):
+        # Annotated by ChatRepository.list for the requesting user.
+        return getattr(obj, 'unread_count', None) or 0
+
 class ChatCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Chat
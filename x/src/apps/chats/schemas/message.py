@@ -10,17 +10,22 @@ class MessageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Message
-        fields = ['id', 'sender', 'sender_username', 'content', 'file_url', 'chat', 'timestamp']
+        fields = ['id', 'sender', 'sender_username', 'content', 'file_url', 'file_name', 'thumbnails', 'blurhash', 'chat', 'timestamp', 'edited_at']
 
 class MessageCreateSerializer(serializers.ModelSerializer):
     file = serializers.FileField(required=False, allow_null=True)
+    attachment_key = serializers.CharField(required=False, max_length=512)
     class Meta:
         model = Message
-        fields = ['content', 'file']
+        fields = ['content', 'file', 'attachment_key']
         read_only_fields = ['id', 'timestamp']
         
 class MessageEditSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = ['content']
-        read_only_fields = ['id', 'timestamp']
\ No newline at end of file
+        read_only_fields = ['id', 'timestamp']
+
+class AttachmentPresignSerializer(serializers.Serializer):
+    filename = serializers.CharField(max_length=255)
+    content_type = serializers.CharField(max_length=255, required=False)
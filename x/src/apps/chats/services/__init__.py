@@ -1,4 +1,6 @@
 from .chat_service import ChatService
+from .membership_service import MembershipService
+from .presence_service import PresenceService
 
-__all__ = ['ChatService']
+__all__ = ['ChatService', 'MembershipService', 'PresenceService']
 
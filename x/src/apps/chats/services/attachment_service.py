@@ -0,0 +1,304 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from mimetypes import guess_type
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections
+
+from ..protocol import encode_frames
+from ..repositories.attachment_repository import AttachmentBlobRepository
+from ..repositories.message_repository import MessageRepository
+from .inbox_notifier import chat_group_name, user_group_name
+from .storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadQueueFull(Exception):
+    """Raised when the upload pool has no room; the client should retry later."""
+
+
+def attachment_key_prefix(chat_id: int, user_id: int) -> str:
+    return f"attachments/{chat_id}/{user_id}/"
+
+
+def new_attachment_key(chat_id: int, user_id: int, filename: str) -> str:
+    # A fresh prefix per upload, so files with the same name never overwrite each other.
+    return f"{attachment_key_prefix(chat_id, user_id)}{uuid.uuid4().hex}/{os.path.basename(filename)}"
+
+
+def blob_key(sha256: str) -> str:
+    """
+    Content-addressed key: the same bytes always land on the same object. It carries no
+    extension, since later senders may name the file differently; each message keeps
+    its own ``file_name``.
+    """
+    return f"blobs/{sha256[:2]}/{sha256}"
+
+
+def spool_and_hash(file) -> tuple[str, str, int]:
+    """Copy an uploaded file to local disk, hashing it on the way; returns ``(path, sha256, size)``."""
+    digest = hashlib.sha256()
+    size = 0
+    spool = tempfile.NamedTemporaryFile(prefix='attachment-', delete=False)
+    try:
+        with spool:
+            file.seek(0)
+            for chunk in iter(lambda: file.read(COPY_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                size += len(chunk)
+                spool.write(chunk)
+    except Exception:
+        os.unlink(spool.name)
+        raise
+    return spool.name, digest.hexdigest(), size
+
+
+def thumbnail_key(key: str, size: int) -> str:
+    # Stored next to the original, e.g. blobs/ab/<sha256>.thumb-320.webp
+    return f"{os.path.splitext(key)[0]}.thumb-{size}.webp"
+
+
+_preview_pool: ProcessPoolExecutor | None = None
+_preview_pool_lock = threading.Lock()
+
+
+def get_preview_pool() -> ProcessPoolExecutor:
+    """Separate processes at low priority, so image decoding never holds the GIL of a request worker."""
+    global _preview_pool
+    with _preview_pool_lock:
+        if _preview_pool is None:
+            from ..imaging import lower_priority
+
+            _preview_pool = ProcessPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS, initializer=lower_priority)
+        return _preview_pool
+
+
+def reset_preview_pool(broken: ProcessPoolExecutor) -> None:
+    """Drop a pool whose worker died (e.g. OOM on a huge image); the next caller gets a fresh one."""
+    global _preview_pool
+    with _preview_pool_lock:
+        if _preview_pool is broken:
+            _preview_pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def submit_previews(path: str) -> tuple[ProcessPoolExecutor, Future] | None:
+    """
+    Start rendering previews for ``path`` as ``(pool, future)``. Previews are optional:
+    ``None`` when they cannot be scheduled, so the upload itself goes ahead regardless.
+    """
+    try:
+        # Imported here so that Pillow is only loaded by processes handling images.
+        from ..imaging import render_previews
+
+        pool = get_preview_pool()
+        try:
+            return pool, pool.submit(render_previews, path, settings.THUMBNAIL_SIZES)
+        except BrokenProcessPool:
+            # A worker died on an earlier image; rebuild the pool once and retry.
+            reset_preview_pool(pool)
+            pool = get_preview_pool()
+            return pool, pool.submit(render_previews, path, settings.THUMBNAIL_SIZES)
+    except Exception:
+        logger.warning('Could not schedule previews for %s', path, exc_info=True)
+        return None
+
+
+def announce_message(message, username: str, upload_id: str) -> None:
+    AttachmentUploader.announce(chat_group_name(message.chat_id), 'chat_message', {
+        "id": message.id,
+        "chat": message.chat_id,
+        "sender_username": username,
+        "content": message.content,
+        "file_url": message.file_url,
+        "file_name": message.file_name,
+        "thumbnails": message.thumbnails,
+        "blurhash": message.blurhash,
+        "timestamp": str(message.timestamp),
+        "upload_id": upload_id,
+    })
+
+
+class AttachmentUploader:
+    """
+    Uploads attachments to the bucket off the request path.
+
+    Request threads only spool the file to local disk, hashing it on the way, and enqueue
+    it; a bounded pool streams it to the bucket as a multipart upload and then creates the
+    ``Message``, announcing it to the chat like a WebSocket message. Content already in
+    the bucket is never uploaded again: on a hash hit the message is created right away.
+    Images get thumbnails and a blurhash, rendered in a process pool while the original
+    uploads. At most ``max_pending`` uploads are accepted at once.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='attachment-upload')
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, *, user, chat_id: int, content: str, file):
+        """
+        Returns ``(upload_id, message)``; ``message`` is set when the content was already
+        stored and no upload was needed, otherwise it is created by the pool later.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise UploadQueueFull()
+        upload_id = uuid.uuid4().hex
+        chat_id = int(chat_id)
+        try:
+            # Django deletes request uploads when the response is sent, so keep a copy.
+            path, sha256, size = spool_and_hash(file)
+        except Exception:
+            self._slots.release()
+            raise
+
+        blob = AttachmentBlobRepository.get_by_hash(sha256)
+        if blob is not None:
+            os.unlink(path)
+            self._slots.release()
+            message = MessageRepository.create_message(
+                content=content, file_url=get_storage().url(blob.key), file_name=os.path.basename(file.name),
+                sender_id=user.id, chat_id=chat_id, thumbnails=blob.thumbnails, blurhash=blob.blurhash,
+            )
+            announce_message(message, user.username, upload_id)
+            return upload_id, message
+
+        try:
+            self._executor.submit(
+                self._upload, upload_id, path, file.name, sha256, size, user.id, user.username, chat_id, content,
+            )
+        except Exception:
+            os.unlink(path)
+            self._slots.release()
+            raise
+        return upload_id, None
+
+    def _upload(self, upload_id, path, filename, sha256, size, user_id, username, chat_id, content):
+        try:
+            close_old_connections()
+            # An identical file may have finished uploading while this one was queued.
+            blob = AttachmentBlobRepository.get_by_hash(sha256)
+            if blob is None:
+                key = blob_key(sha256)
+                content_type = guess_type(filename)[0] or 'application/octet-stream'
+                previews = None
+                if content_type.startswith('image/'):
+                    previews = submit_previews(path)
+                with open(path, 'rb') as spool:
+                    get_storage().upload(spool, key, content_type)
+                thumbnails, blurhash = self._store_previews(previews, key)
+                close_old_connections()
+                blob = AttachmentBlobRepository.record(
+                    sha256=sha256, key=key, size=size, content_type=content_type,
+                    thumbnails=thumbnails, blurhash=blurhash,
+                )
+            message = MessageRepository.create_message(
+                content=content,
+                file_url=get_storage().url(blob.key),
+                file_name=os.path.basename(filename),
+                sender_id=user_id,
+                chat_id=chat_id,
+                thumbnails=blob.thumbnails,
+                blurhash=blob.blurhash,
+            )
+            announce_message(message, username, upload_id)
+        except Exception:
+            logger.exception('Attachment upload %s failed', upload_id)
+            self.announce(user_group_name(user_id), 'inbox_upload_failed', {
+                "t": "upload_failed", "chat": chat_id, "upload_id": upload_id,
+            })
+        finally:
+            close_old_connections()
+            os.unlink(path)
+            self._slots.release()
+
+    @staticmethod
+    def _store_previews(previews, key: str) -> tuple[dict, str]:
+        """Upload rendered thumbnails next to ``key``; a file that is not a readable image just gets none."""
+        if previews is None:
+            return {}, ''
+        from ..imaging import THUMBNAIL_CONTENT_TYPE
+
+        pool, future = previews
+        try:
+            result = future.result(timeout=settings.THUMBNAIL_TIMEOUT)
+        except BrokenProcessPool:
+            logger.warning('Preview worker died while rendering %s', key, exc_info=True)
+            reset_preview_pool(pool)
+            return {}, ''
+        except Exception:
+            logger.warning('Could not render previews for %s', key, exc_info=True)
+            return {}, ''
+        storage = get_storage()
+        thumbnails = {}
+        for size, data, width, height in result['thumbnails']:
+            thumb_key = thumbnail_key(key, size)
+            storage.upload(io.BytesIO(data), thumb_key, THUMBNAIL_CONTENT_TYPE)
+            thumbnails[str(size)] = {'url': storage.url(thumb_key), 'width': width, 'height': height}
+        return thumbnails, result['blurhash']
+
+    @staticmethod
+    def announce(group: str, event_type: str, payload: dict) -> None:
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        try:
+            async_to_sync(channel_layer.group_send)(group, {"type": event_type, "frames": encode_frames(payload)})
+        except Exception:
+            logger.exception('Failed to announce %s to %s', event_type, group)
+
+
+@lru_cache(maxsize=None)
+def get_attachment_uploader() -> AttachmentUploader:
+    return AttachmentUploader(
+        max_workers=settings.ATTACHMENT_UPLOAD_WORKERS,
+        max_pending=settings.ATTACHMENT_UPLOAD_QUEUE_SIZE,
+    )
+
+
+class AttachmentService:
+    @staticmethod
+    def presign_upload(user, chat_id: int, filename: str, content_type: str|None = None) -> dict:
+        """
+        A short-lived URL the client PUTs the file to directly, bypassing the app servers.
+        Raises ``DirectUploadUnsupported`` when the storage backend has no such URLs.
+
+        The app never sees these bytes, so unlike background uploads they are neither
+        hashed nor deduplicated: every presigned upload is its own object.
+        """
+        key = new_attachment_key(chat_id, user.id, filename)
+        content_type = content_type or guess_type(filename)[0] or 'application/octet-stream'
+        upload_url = get_storage().presign_upload(key, content_type, settings.ATTACHMENT_PRESIGN_EXPIRES)
+        return {
+            'key': key,
+            'upload_url': upload_url,
+            'method': 'PUT',
+            'headers': {'Content-Type': content_type},
+            'expires_in': settings.ATTACHMENT_PRESIGN_EXPIRES,
+        }
+
+    @staticmethod
+    def resolve_uploaded(user, chat_id: int, key: str) -> str|None:
+        """URL of a directly uploaded object, if ``key`` was issued to this user for this chat and exists."""
+        if not key.startswith(attachment_key_prefix(chat_id, user.id)) or '..' in key:
+            return None
+        storage = get_storage()
+        if not storage.exists(key):
+            return None
+        return storage.url(key)
+
+    @staticmethod
+    def upload_in_background(user, chat_id: int, content: str, file):
+        return get_attachment_uploader().submit(user=user, chat_id=chat_id, content=content, file=file)
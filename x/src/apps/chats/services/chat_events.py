@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+import weakref
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from .chat_service import ChatService
+
+logger = logging.getLogger(__name__)
+
+
+class Throttle:
+    """Lets an event through at most once per ``interval`` seconds for each key."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._last = {}
+
+    def allow(self, key) -> bool:
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            return False
+        self._last[key] = now
+        return True
+
+    def remaining(self, key) -> float:
+        last = self._last.get(key)
+        if last is None:
+            return 0.0
+        return max(0.0, self.interval - (time.monotonic() - last))
+
+
+class ReadMarkBuffer:
+    """
+    Per-process coalescing of read receipts.
+
+    Every receipt only raises an in-memory high-water mark per ``(chat, user)``; a single
+    task writes whatever accumulated every ``flush_interval`` seconds in one transaction,
+    so a member scrolling through a chat costs one row update rather than one per event.
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._marks = {}
+        self._task = None
+
+    def mark(self, chat_id: int, user_id: int, message_id: int) -> None:
+        key = (int(chat_id), user_id)
+        if message_id > self._marks.get(key, 0):
+            self._marks[key] = message_id
+        self._ensure_running()
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def flush(self) -> None:
+        if not self._marks:
+            return
+        marks, self._marks = self._marks, {}
+        try:
+            rejected = await database_sync_to_async(ChatService.save_read_marks)(marks)
+        except Exception:
+            logger.exception('Failed to persist %d read marks', len(marks))
+            # Put them back for the next round unless newer marks already superseded them.
+            for key, message_id in marks.items():
+                if message_id > self._marks.get(key, 0):
+                    self._marks[key] = message_id
+            return
+        if rejected:
+            # Retrying would fail the same way; drop them instead of blocking the rest.
+            logger.warning('Dropped %d read marks rejected by the database: %s', len(rejected), sorted(rejected))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+_buffers = weakref.WeakKeyDictionary()
+
+
+def get_read_mark_buffer() -> ReadMarkBuffer:
+    """The buffer bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    buffer = _buffers.get(loop)
+    if buffer is None:
+        buffer = _buffers[loop] = ReadMarkBuffer(flush_interval=settings.CHAT_READ_FLUSH_INTERVAL)
+    return buffer
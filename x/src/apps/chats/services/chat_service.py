@@ -1,4 +1,6 @@
 from ..repositories.chat_repository import ChatRepository
+from .inbox_notifier import InboxNotifier
+from .membership_service import MembershipService
 
 class ChatService:
     @staticmethod
@@ -6,16 +8,33 @@ class ChatService:
         chat = ChatRepository.get(user1=user1, user2=user2)
         if chat:
             return chat
-        return ChatRepository.create(data={}, members=[user1, user2])
+        chat = ChatRepository.create(data={}, members=[user1, user2])
+        InboxNotifier.chat_added(chat.pk, [user1.id, user2.id])
+        return chat
 
     @staticmethod
     def list_chats_for_user(user):
         return ChatRepository.list(user=user)
 
+    @staticmethod
+    def mark_read(pk, user):
+        if not MembershipService.is_member(pk, user.id):
+            return False
+        ChatRepository.mark_read(pk, user.id)
+        return True
+
+    @staticmethod
+    def save_read_marks(marks: dict[tuple[int, int], int]) -> set[tuple[int, int]]:
+        return ChatRepository.save_read_marks(marks)
+
     @staticmethod
     def delete_chat_for_user(pk, user):
+        if not MembershipService.is_member(pk, user.id):
+            return False
         instance = ChatRepository.get_by_id(pk)
-        if not instance or user not in instance.members.all():
+        if not instance:
             return False
+        member_ids = MembershipService.get_member_ids(pk)
         ChatRepository.delete(user, instance)
+        InboxNotifier.chat_removed(int(pk), member_ids)
         return True
@@ -0,0 +1,39 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from ..protocol import encode_frames
+
+
+def user_group_name(user_id) -> str:
+    return f'user_{user_id}'
+
+
+def chat_group_name(chat_id) -> str:
+    return f'chat_{chat_id}'
+
+
+class InboxNotifier:
+    """Pushes chat list changes to the per-user groups of multiplexed sockets."""
+
+    @staticmethod
+    def chat_added(chat_id: int, user_ids) -> None:
+        InboxNotifier._send(user_ids, 'inbox_chat_added', {'t': 'chat_added', 'chat': chat_id}, chat_id)
+
+    @staticmethod
+    def chat_removed(chat_id: int, user_ids) -> None:
+        InboxNotifier._send(user_ids, 'inbox_chat_removed', {'t': 'chat_removed', 'chat': chat_id}, chat_id)
+
+    @staticmethod
+    def _send(user_ids, event_type: str, payload: dict, chat_id: int) -> None:
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        event = {'type': event_type, 'chat': chat_id, 'frames': encode_frames(payload)}
+        user_ids = list(user_ids)
+
+        def send():
+            for user_id in user_ids:
+                async_to_sync(channel_layer.group_send)(user_group_name(user_id), event)
+
+        transaction.on_commit(send)
@@ -0,0 +1,20 @@
+from ..repositories.chat_repository import ChatRepository
+
+class MembershipService:
+    """Cached chat membership lookups for WebSocket connects and message endpoints."""
+
+    @staticmethod
+    def get_member_ids(chat_id) -> frozenset[int]:
+        return ChatRepository.get_member_ids(chat_id)
+
+    @staticmethod
+    def is_member(chat_id, user_id) -> bool:
+        return user_id in ChatRepository.get_member_ids(chat_id)
+
+    @staticmethod
+    def recent_chat_ids(user_id, limit: int) -> list[int]:
+        return ChatRepository.recent_chat_ids(user_id, limit)
+
+    @staticmethod
+    def invalidate(chat_id) -> None:
+        ChatRepository.invalidate_members(chat_id)
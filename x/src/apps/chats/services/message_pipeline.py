@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import weakref
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from .message_service import MessageService
+
+logger = logging.getLogger(__name__)
+
+
+class MessagePipelineFull(Exception):
+    """Raised when the write queue is at capacity; the caller should shed the message."""
+
+
+class MessageWritePipeline:
+    """
+    Per-process batching writer for WebSocket messages.
+
+    Consumers submit messages and await the saved ``Message``; a single task drains the
+    queue, waiting at most ``max_delay`` seconds to gather up to ``max_batch`` messages
+    from all chats, and persists them with one ``bulk_create`` on one thread-pool hop.
+    If that batch fails, say because a chat was deleted meanwhile, its messages are
+    retried one at a time.
+    """
+
+    def __init__(self, max_batch: int, max_delay: float, max_pending: int):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self._task = None
+
+    async def submit(self, *, sender_id: int, chat_id: int, content: str):
+        self._ensure_running()
+        future = asyncio.get_running_loop().create_future()
+        entry = {'sender_id': sender_id, 'chat_id': int(chat_id), 'content': content}
+        try:
+            self._queue.put_nowait((entry, future))
+        except asyncio.QueueFull:
+            raise MessagePipelineFull()
+        return await future
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            entries = [entry for entry, _ in batch]
+            try:
+                messages = await database_sync_to_async(MessageService.send_messages_bulk)(entries)
+            except Exception:
+                logger.exception('Failed to persist a batch of %d messages, retrying one by one', len(batch))
+                await self._persist_individually(batch)
+                continue
+            for (_, future), message in zip(batch, messages):
+                if not future.done():
+                    future.set_result(message)
+
+    async def _persist_individually(self, batch) -> None:
+        """Fallback after a failed batch, so only the offending senders see an error."""
+        for entry, future in batch:
+            try:
+                [message] = await database_sync_to_async(MessageService.send_messages_bulk)([entry])
+            except Exception as exc:
+                if not future.done():
+                    future.set_exception(exc)
+            else:
+                if not future.done():
+                    future.set_result(message)
+
+
+_pipelines = weakref.WeakKeyDictionary()
+
+
+def get_message_pipeline() -> MessageWritePipeline:
+    """The pipeline bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    pipeline = _pipelines.get(loop)
+    if pipeline is None:
+        pipeline = _pipelines[loop] = MessageWritePipeline(
+            max_batch=settings.CHAT_WRITE_BATCH_SIZE,
+            max_delay=settings.CHAT_WRITE_BATCH_DELAY_MS / 1000,
+            max_pending=settings.CHAT_WRITE_QUEUE_SIZE,
+        )
+    return pipeline
@@ -1,20 +1,9 @@
+import os
+
 from ..repositories.message_repository import MessageRepository
-import boto3
-from django.conf import settings
-from botocore.client import Config
-from mimetypes import guess_type
-
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-    endpoint_url=settings.R2_ENDPOINT_URL,
-    region_name='auto',
-    config=Config(
-        signature_version='s3v4',
-        s3={'addressing_style': 'path'}
-    )
-)
+from ..repositories.chat_repository import ChatRepository
+from .attachment_service import AttachmentService
+from src.common.exceptions import ValidationException
 
 class MessageService:
     @staticmethod
@@ -22,26 +11,38 @@ class MessageService:
         return MessageRepository.get_message_by_id(message_id)
     
     @staticmethod
-    def send_message(user, content: str, chat_id: int, file=None):
+    def send_message(user, content: str, chat_id: int, attachment_key: str|None = None):
+        """Create a message, optionally pointing at a file already uploaded through a presigned URL."""
         file_url = None
-        if file:
-            key = f"{settings.R2_BUCKET_NAME}/{file.name}"
-            content_type, _ = guess_type(file.name)
-            s3_client.upload_fileobj(
-                Fileobj=file, 
-                Bucket=settings.R2_BUCKET_NAME, 
-                Key=key,
-                ExtraArgs={'ContentType': content_type}
-            )
-            file_url = f"{settings.R2_ENDPOINT_URL}/{key}"
+        file_name = ''
+        if attachment_key:
+            file_url = AttachmentService.resolve_uploaded(user, chat_id, attachment_key)
+            if file_url is None:
+                raise ValidationException('Attachment not found.')
+            file_name = os.path.basename(attachment_key)
 
         return MessageRepository.create_message(
         content=content,
         file_url=file_url,
+        file_name=file_name,
         sender_id=user.id,
         chat_id=chat_id
     )
     
+    @staticmethod
+    def send_message_with_file(user, content: str, chat_id: int, file):
+        """
+        Queue ``file`` for upload; returns ``(upload_id, message)``. When the content is
+        already stored the message is created at once, otherwise ``message`` is ``None``
+        and it is created and broadcast to the chat once the upload completes.
+        """
+        return AttachmentService.upload_in_background(user, chat_id, content, file)
+
+    @staticmethod
+    def send_messages_bulk(entries: list[dict]):
+        """Persist a batch of text messages (``sender_id``, ``chat_id``, ``content``) at once."""
+        return MessageRepository.bulk_create_messages(entries)
+    
     @staticmethod
     def remove_message(message_id: int, user):
         message = MessageRepository.get_message_by_id(message_id)
@@ -58,4 +59,26 @@ class MessageService:
     
     @staticmethod
     def get_messages_for_chat(chat_id: int):
-        return MessageRepository.list_messages_by_chat(chat_id)
\ No newline at end of file
+        return MessageRepository.list_messages_by_chat(chat_id)
+
+    @staticmethod
+    def get_message_window(chat_id: int, before: int|None = None, after: int|None = None, limit: int = 50):
+        return MessageRepository.list_message_window(chat_id, before=before, after=after, limit=limit)
+
+    @staticmethod
+    def get_sync_version(chat_id: int) -> int|None:
+        return ChatRepository.get_sync_version(chat_id)
+
+    @staticmethod
+    def get_changes_since(chat_id: int, version: int, limit: int = 500):
+        """
+        Returns ``(messages, deleted_ids, sync_token, has_more)`` for everything that
+        changed in the chat after ``version``.
+        """
+        changes = MessageRepository.list_changes_since(chat_id, version, limit + 1)
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        messages = [message for message in changes if not message.is_deleted]
+        deleted_ids = [message.id for message in changes if message.is_deleted]
+        sync_token = changes[-1].version if changes else version
+        return messages, deleted_ids, sync_token, has_more
\ No newline at end of file
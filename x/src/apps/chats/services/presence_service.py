@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import weakref
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from ..protocol import encode_frames
+from ..repositories.chat_repository import ChatRepository
+from ..repositories.presence_store import get_presence_store
+from .inbox_notifier import chat_group_name
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceService:
+    @staticmethod
+    def online_user_ids(user_ids) -> set[int]:
+        """Which of ``user_ids`` have at least one live socket on any worker."""
+        return get_presence_store().online(user_ids)
+
+    @staticmethod
+    def visible_user_ids(viewer_id: int, user_ids) -> set[int]:
+        """Which of ``user_ids`` ``viewer_id`` may see the presence of: themselves and people they share a chat with."""
+        return ChatRepository.co_member_ids(viewer_id, user_ids)
+
+
+class PresenceTracker:
+    """
+    Per-process bookkeeping of the sockets this worker holds.
+
+    Connects and disconnects touch the shared store right away, so lookups are current.
+    Every ``diff_interval`` seconds the users whose state may have changed are claimed
+    against the store's announced set, and the transitions this worker won are pushed,
+    one frame per chat, to the chats those users are in; a user connecting on a second
+    worker is therefore not announced twice. Every ``heartbeat_interval`` seconds all
+    local sockets are refreshed in a single batch, and announced users whose sockets
+    all lapsed (their worker died) are swept offline. Nothing here touches the database
+    except resolving the chats of users that changed.
+    """
+
+    def __init__(self, ttl: int, heartbeat_interval: float, diff_interval: float):
+        self.ttl = ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.diff_interval = diff_interval
+        self._connections: dict[str, int] = {}
+        self._dirty: set[int] = set()
+        self._task = None
+
+    async def connect(self, connection_id: str, user_id: int) -> None:
+        self._connections[connection_id] = user_id
+        await sync_to_async(get_presence_store().touch, thread_sensitive=False)([(user_id, connection_id)], self.ttl)
+        self._dirty.add(user_id)
+        self._ensure_running()
+
+    async def disconnect(self, connection_id: str) -> None:
+        user_id = self._connections.pop(connection_id, None)
+        if user_id is None:
+            return
+        await sync_to_async(get_presence_store().remove, thread_sensitive=False)(user_id, connection_id)
+        self._dirty.add(user_id)
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        last_heartbeat = loop.time()
+        while True:
+            await asyncio.sleep(self.diff_interval)
+            try:
+                if loop.time() - last_heartbeat >= self.heartbeat_interval:
+                    last_heartbeat = loop.time()
+                    await self.heartbeat()
+                    await self.sweep()
+                await self.publish_changes()
+            except Exception:
+                logger.exception('Presence update failed')
+
+    async def heartbeat(self) -> None:
+        entries = [(user_id, connection_id) for connection_id, user_id in self._connections.items()]
+        if entries:
+            await sync_to_async(get_presence_store().touch, thread_sensitive=False)(entries, self.ttl)
+
+    async def sweep(self) -> None:
+        """Announce users whose sockets all expired without a disconnect, e.g. on a crashed worker."""
+        store = get_presence_store()
+        lapsed = await sync_to_async(store.lapsed, thread_sensitive=False)()
+        if not lapsed:
+            return
+        went_offline = await sync_to_async(store.claim_offline, thread_sensitive=False)(lapsed)
+        await self.announce({user_id: False for user_id in went_offline})
+
+    async def publish_changes(self) -> None:
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        store = get_presence_store()
+        went_online = await sync_to_async(store.claim_online, thread_sensitive=False)(dirty, self.ttl)
+        went_offline = await sync_to_async(store.claim_offline, thread_sensitive=False)(dirty - went_online)
+        await self.announce({
+            **{user_id: True for user_id in went_online},
+            **{user_id: False for user_id in went_offline},
+        })
+
+    async def announce(self, changed: dict[int, bool]) -> None:
+        """Push ``{user_id: is_online}`` transitions to every chat those users are in."""
+        if not changed:
+            return
+        by_chat = defaultdict(list)
+        memberships = await database_sync_to_async(ChatRepository.chat_ids_by_user)(list(changed))
+        for user_id, chat_id in memberships:
+            by_chat[chat_id].append(user_id)
+
+        channel_layer = get_channel_layer()
+        for chat_id, user_ids in by_chat.items():
+            payload = {
+                't': 'presence',
+                'chat': chat_id,
+                'online': [user_id for user_id in user_ids if changed[user_id]],
+                'offline': [user_id for user_id in user_ids if not changed[user_id]],
+            }
+            await channel_layer.group_send(chat_group_name(chat_id), {'type': 'chat_presence', 'frames': encode_frames(payload)})
+
+
+_trackers = weakref.WeakKeyDictionary()
+
+
+def get_presence_tracker() -> PresenceTracker:
+    """The tracker bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    tracker = _trackers.get(loop)
+    if tracker is None:
+        tracker = _trackers[loop] = PresenceTracker(
+            ttl=settings.PRESENCE_TTL,
+            heartbeat_interval=settings.PRESENCE_HEARTBEAT_INTERVAL,
+            diff_interval=settings.PRESENCE_DIFF_INTERVAL,
+        )
+    return tracker
@@ -0,0 +1,149 @@
+"""
+Object storage for chat attachments.
+
+Backends are built on first use, so importing the chats app neither loads boto3 nor
+requires bucket credentials; processes that never touch a file (``migrate``, most
+workers at start-up) never pay for them.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.conf import settings
+
+
+class DirectUploadUnsupported(Exception):
+    """Raised by backends that cannot hand out presigned upload URLs."""
+
+
+class LocalStorage:
+    """Files under ``MEDIA_ROOT``, for local development and tests."""
+
+    supports_presigned_upload = False
+
+    def __init__(self, root, base_url: str):
+        self.root = str(root)
+        self.base_url = base_url.rstrip('/') + '/'
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(os.path.abspath(self.root) + os.sep):
+            raise ValueError(f'Key escapes the storage root: {key}')
+        return path
+
+    def url(self, key: str) -> str:
+        return self.base_url + quote(key)
+
+    def upload(self, fileobj, key: str, content_type: str) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write next to the target and rename, so readers never see a partial file.
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as tmp:
+            shutil.copyfileobj(fileobj, tmp)
+        os.replace(tmp.name, path)
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def presign_upload(self, key: str, content_type: str, expires: int) -> str:
+        raise DirectUploadUnsupported()
+
+
+class S3Storage:
+    """
+    An S3-compatible bucket (Cloudflare R2 in production).
+
+    One client is shared by all threads, created on first use with a connection pool
+    large enough for every upload worker to send its parts in parallel.
+    """
+
+    supports_presigned_upload = True
+
+    def __init__(self, *, bucket: str, endpoint_url: str, access_key_id: str, secret_access_key: str,
+                 max_pool_connections: int, chunk_size: int, part_concurrency: int):
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self._credentials = (access_key_id, secret_access_key)
+        self._max_pool_connections = max_pool_connections
+        self._chunk_size = chunk_size
+        self._part_concurrency = part_concurrency
+        self._lock = threading.Lock()
+        self._client = None
+        self._transfer_config = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import boto3
+                    from boto3.s3.transfer import TransferConfig
+                    from botocore.client import Config
+
+                    access_key_id, secret_access_key = self._credentials
+                    self._transfer_config = TransferConfig(
+                        multipart_threshold=self._chunk_size,
+                        multipart_chunksize=self._chunk_size,
+                        max_concurrency=self._part_concurrency,
+                    )
+                    self._client = boto3.client(
+                        's3',
+                        aws_access_key_id=access_key_id,
+                        aws_secret_access_key=secret_access_key,
+                        endpoint_url=self.endpoint_url,
+                        region_name='auto',
+                        config=Config(
+                            signature_version='s3v4',
+                            s3={'addressing_style': 'path'},
+                            max_pool_connections=self._max_pool_connections,
+                        )
+                    )
+        return self._client
+
+    def url(self, key: str) -> str:
+        return f"{self.endpoint_url}/{self.bucket}/{quote(key)}"
+
+    def upload(self, fileobj, key: str, content_type: str) -> None:
+        """Streams ``fileobj`` as a multipart upload once it exceeds the chunk size."""
+        client = self.client
+        client.upload_fileobj(
+            Fileobj=fileobj,
+            Bucket=self.bucket,
+            Key=key,
+            ExtraArgs={'ContentType': content_type},
+            Config=self._transfer_config,
+        )
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError:
+            return False
+        return True
+
+    def presign_upload(self, key: str, content_type: str, expires: int) -> str:
+        return self.client.generate_presigned_url(
+            'put_object',
+            Params={'Bucket': self.bucket, 'Key': key, 'ContentType': content_type},
+            ExpiresIn=expires,
+        )
+
+
+@lru_cache(maxsize=None)
+def get_storage():
+    if settings.ATTACHMENT_STORAGE_BACKEND == 's3':
+        return S3Storage(
+            bucket=settings.R2_BUCKET_NAME,
+            endpoint_url=settings.R2_ENDPOINT_URL,
+            access_key_id=settings.R2_ACCESS_KEY_ID,
+            secret_access_key=settings.R2_SECRET_ACCESS_KEY,
+            max_pool_connections=settings.ATTACHMENT_UPLOAD_WORKERS * settings.ATTACHMENT_MULTIPART_CONCURRENCY + 10,
+            chunk_size=settings.ATTACHMENT_MULTIPART_CHUNK_SIZE,
+            part_concurrency=settings.ATTACHMENT_MULTIPART_CONCURRENCY,
+        )
+    return LocalStorage(settings.MEDIA_ROOT, settings.MEDIA_URL)
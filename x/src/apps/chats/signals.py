@@ -0,0 +1,22 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models.chat import Chat, ChatMember
+from .services.membership_service import MembershipService
+
+
+@receiver(m2m_changed, sender=Chat.members.through)
+def chat_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        MembershipService.invalidate(instance.pk)
+    elif pk_set:
+        for chat_id in pk_set:
+            MembershipService.invalidate(chat_id)
+
+
+@receiver(post_save, sender=ChatMember)
+@receiver(post_delete, sender=ChatMember)
+def chat_member_saved_or_deleted(sender, instance, **kwargs):
+    MembershipService.invalidate(instance.chat_id)
@@ -0,0 +1,149 @@
+"""
+Attachment tests
+"""
+import hashlib
+import io
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from src.apps.chats.models.attachment import AttachmentBlob
+from src.apps.chats.models.message import Message
+from src.apps.chats.services.attachment_service import (
+    AttachmentService,
+    attachment_key_prefix,
+    blob_key,
+    get_attachment_uploader,
+    new_attachment_key,
+)
+from src.apps.chats.services.chat_service import ChatService
+from src.apps.chats.services.storage import get_storage
+from src.apps.users.models import User
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+class AttachmentTestMixin:
+    """Local storage under a throwaway ``MEDIA_ROOT`` and a fresh upload pool per test."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        storage = override_settings(
+            ATTACHMENT_STORAGE_BACKEND='local',
+            MEDIA_ROOT=media_root,
+            CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS,
+        )
+        storage.enable()
+        self.addCleanup(storage.disable)
+        for factory in (get_storage, get_attachment_uploader):
+            factory.cache_clear()
+            self.addCleanup(factory.cache_clear)
+
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='password')
+        self.other = User.objects.create_user(username='bob', email='bob@example.com', password='password')
+        self.chat = ChatService.get_or_create_chat(self.user, self.other)
+        self.client.force_authenticate(self.user)
+
+    def send_file(self, data: bytes, name: str = 'notes.txt'):
+        return self.client.post(
+            f'/api/chats/{self.chat.pk}/messages/',
+            data={'content': 'See attached', 'file': SimpleUploadedFile(name, data, content_type='text/plain')},
+            format='multipart',
+        )
+
+
+# The upload pool writes from its own threads and connections, so rows must be committed.
+class BackgroundUploadTests(AttachmentTestMixin, APITransactionTestCase):
+    def wait_for_uploads(self):
+        get_attachment_uploader()._executor.shutdown(wait=True)
+
+    def test_upload_creates_message_once_stored(self):
+        data = b'hello attachment'
+        response = self.send_file(data)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertTrue(response.data['upload_id'])
+
+        self.wait_for_uploads()
+        key = blob_key(hashlib.sha256(data).hexdigest())
+        self.assertTrue(get_storage().exists(key))
+        self.assertTrue(AttachmentBlob.objects.filter(key=key, size=len(data)).exists())
+        message = Message.objects.get(chat=self.chat)
+        self.assertEqual(message.sender_id, self.user.pk)
+        self.assertEqual(message.content, 'See attached')
+        self.assertEqual(message.file_url, get_storage().url(key))
+        self.assertEqual(message.file_name, 'notes.txt')
+
+    def test_known_content_is_not_uploaded_again(self):
+        data = b'same bytes twice'
+        self.assertEqual(self.send_file(data).status_code, 202)
+        self.wait_for_uploads()
+
+        response = self.send_file(data, name='copy.txt')
+        self.assertEqual(response.status_code, 201)
+        first, second = Message.objects.filter(chat=self.chat).order_by('id')
+        self.assertEqual(response.data['id'], second.pk)
+        self.assertEqual(second.file_url, first.file_url)
+        # Each message keeps the name its sender gave the shared object.
+        self.assertEqual((first.file_name, second.file_name), ('notes.txt', 'copy.txt'))
+        self.assertEqual(response.data['file_name'], 'copy.txt')
+        self.assertEqual(AttachmentBlob.objects.count(), 1)
+
+
+class UploadQueueTests(AttachmentTestMixin, APITestCase):
+    @override_settings(ATTACHMENT_UPLOAD_QUEUE_SIZE=0)
+    def test_full_queue_answers_503(self):
+        get_attachment_uploader.cache_clear()
+        response = self.send_file(b'no room')
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(Message.objects.filter(chat=self.chat).exists())
+
+
+class ResolveUploadedTests(AttachmentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.key = new_attachment_key(self.chat.pk, self.user.pk, 'photo.png')
+        get_storage().upload(io.BytesIO(b'image bytes'), self.key, 'image/png')
+
+    def test_own_key_resolves(self):
+        url = AttachmentService.resolve_uploaded(self.user, self.chat.pk, self.key)
+        self.assertEqual(url, get_storage().url(self.key))
+
+    def test_key_of_another_user_is_rejected(self):
+        self.assertIsNone(AttachmentService.resolve_uploaded(self.other, self.chat.pk, self.key))
+
+    def test_key_of_another_chat_is_rejected(self):
+        other_chat = ChatService.get_or_create_chat(
+            self.user, User.objects.create_user(username='carol', email='carol@example.com', password='password'),
+        )
+        self.assertIsNone(AttachmentService.resolve_uploaded(self.user, other_chat.pk, self.key))
+
+    def test_key_escaping_the_prefix_is_rejected(self):
+        target = f'{attachment_key_prefix(self.chat.pk, self.other.pk)}photo.png'
+        get_storage().upload(io.BytesIO(b'image bytes'), target, 'image/png')
+        key = f'{attachment_key_prefix(self.chat.pk, self.user.pk)}../{self.other.pk}/photo.png'
+        self.assertIsNone(AttachmentService.resolve_uploaded(self.user, self.chat.pk, key))
+
+    def test_missing_key_is_rejected(self):
+        key = new_attachment_key(self.chat.pk, self.user.pk, 'never-uploaded.png')
+        self.assertIsNone(AttachmentService.resolve_uploaded(self.user, self.chat.pk, key))
+
+    def test_message_with_foreign_key_is_refused(self):
+        self.client.force_authenticate(self.other)
+        response = self.client.post(
+            f'/api/chats/{self.chat.pk}/messages/', data={'content': 'Stolen', 'attachment_key': self.key},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Message.objects.filter(chat=self.chat).exists())
+
+    def test_message_keeps_uploaded_file_name(self):
+        response = self.client.post(
+            f'/api/chats/{self.chat.pk}/messages/', data={'content': 'Photo', 'attachment_key': self.key},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['file_name'], 'photo.png')
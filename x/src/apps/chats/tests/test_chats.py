@@ -0,0 +1,52 @@
+"""
+Chat tests
+"""
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+
+from src.apps.chats.services.chat_service import ChatService
+from src.apps.chats.services.message_service import MessageService
+from src.apps.users.models import User
+from src.common.testing import ImportBudgetMixin
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class MessageEndpointTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='password')
+        self.other = User.objects.create_user(username='bob', email='bob@example.com', password='password')
+        self.chat = ChatService.get_or_create_chat(self.user, self.other)
+        self.message = MessageService.send_message(user=self.user, content='Hello', chat_id=self.chat.pk)
+        self.client.force_authenticate(self.user)
+
+    def test_delete_twice(self):
+        self.assertEqual(self.client.delete(f'/api/messages/{self.message.pk}/').status_code, 204)
+        self.assertEqual(self.client.delete(f'/api/messages/{self.message.pk}/').status_code, 404)
+
+    def test_edit_deleted_message(self):
+        self.client.delete(f'/api/messages/{self.message.pk}/')
+        response = self.client.put(f'/api/messages/{self.message.pk}/', data={'content': 'Edited'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_unknown_message(self):
+        self.assertEqual(self.client.delete('/api/messages/999999/').status_code, 404)
+
+    def test_foreign_message(self):
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.delete(f'/api/messages/{self.message.pk}/').status_code, 403)
+        response = self.client.put(f'/api/messages/{self.message.pk}/', data={'content': 'Edited'})
+        self.assertEqual(response.status_code, 403)
+
+
+class ChatImportBudgetTests(ImportBudgetMixin, SimpleTestCase):
+    """Attachment code stays cheap to import: the storage SDK and imaging load on first use."""
+
+    heavy_modules = ('boto3', 'botocore', 'PIL')
+
+    def test_storage_import(self):
+        self.assertImportWithinBudget('src.apps.chats.services.storage', 50, forbidden=self.heavy_modules)
+
+    def test_message_service_import(self):
+        self.assertImportWithinBudget('src.apps.chats.services.message_service', 150, forbidden=self.heavy_modules)
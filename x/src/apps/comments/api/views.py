@@ -17,6 +17,14 @@ class CommentViewSet(
 ):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {
+        'list': 2,
+        'retrieve': 2,
+        'create': 4,
+        'update': 6,
+        'partial_update': 6,
+        'destroy': 4,
+    }
 
     def get_queryset(self):
         return CommentService.list_comments()
@@ -22,6 +22,9 @@ class Comment(models.Model):
 
 	class Meta:
 		ordering = ['-created_at']
+		indexes = [
+			models.Index(fields=['post', '-created_at', '-id'], name='comment_post_recent_idx'),
+		]
 
 	def __str__(self) -> str:
 		return self.content
@@ -1,5 +1,11 @@
+from __future__ import annotations
+
+from collections import defaultdict
 from typing import Any
 
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
 from src.apps.comments.models.comment import Comment
 from src.apps.posts.models import post
 
@@ -7,7 +13,7 @@ from src.apps.posts.models import post
 class CommentRepository:
 	@staticmethod
 	def list(filters: dict[str, Any] = None):
-		qs = Comment.objects.all()
+		qs = Comment.objects.select_related('author').all()
 		if filters:
 			qs = qs.filter(**filters)
 		return qs
@@ -37,3 +43,21 @@ class CommentRepository:
 	@staticmethod
 	def get_by_post():
 		return Comment.objects.filter(post=post)
+
+	@staticmethod
+	def recent_author_usernames(post_ids, limit: int) -> dict[int, list[str]]:
+		rows = (
+			Comment.objects.filter(post_id__in=post_ids)
+			.annotate(rank=Window(
+				RowNumber(),
+				partition_by=F('post_id'),
+				order_by=[F('created_at').desc(), F('id').desc()],
+			))
+			.filter(rank__lte=limit)
+			.order_by('post_id', 'rank')
+			.values_list('post_id', 'author__username')
+		)
+		previews = defaultdict(list)
+		for post_id, username in rows:
+			previews[post_id].append(username)
+		return previews
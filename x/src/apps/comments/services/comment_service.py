@@ -1,7 +1,10 @@
 from typing import Any
 
+from django.db import transaction
+
 from src.apps.comments.repositories.comment_repository import CommentRepository
 from src.apps.comments.models.comment import Comment
+from src.apps.posts.repositories.post_repository import PostRepository
 
 
 class CommentService:
@@ -14,25 +17,47 @@ class CommentService:
 		filters = {'post_id': post_id}
 		return CommentRepository.list(filters=filters)
 
+	@staticmethod
+	def recent_commenters(post_ids, limit: int) -> dict[int, list[str]]:
+		if not post_ids:
+			return {}
+		return CommentRepository.recent_author_usernames(post_ids, limit)
+
 	@staticmethod
 	def get_comment(pk: int) -> Comment|None:
 		return CommentRepository.get(pk=pk)
 
 	@staticmethod
+	@transaction.atomic
 	def create_comment(*, data: dict[str, Any], author) -> Comment:
-		return CommentRepository.create(data=data, author=author)
+		comment = CommentRepository.create(data=data, author=author)
+		if comment.post_id:
+			PostRepository.increment_counter(comment.post_id, 'comment_count', 1)
+		return comment
 
 	@staticmethod
+	@transaction.atomic
 	def update_comment(pk: int, data: dict[str, Any], user) -> Comment|None:
 		instance = CommentRepository.get(pk=pk)
-		if not instance or instance.author != user:
+		if not instance or instance.author_id != user.pk:
 			return None
-		return CommentRepository.update(instance, data)
+		old_post_id = instance.post_id
+		comment = CommentRepository.update(instance, data)
+		if comment.post_id != old_post_id:
+			if old_post_id:
+				PostRepository.increment_counter(old_post_id, 'comment_count', -1)
+			if comment.post_id:
+				PostRepository.increment_counter(comment.post_id, 'comment_count', 1)
+		return comment
 
 	@staticmethod
+	@transaction.atomic
 	def delete_comment(pk: int, user) -> bool:
 		instance = CommentRepository.get(pk=pk)
-		if not instance or instance.author != user:
+		if not instance or instance.author_id != user.pk:
 			return False
+		post_id = instance.post_id
 		CommentRepository.delete(instance)
+		if post_id:
+			PostRepository.increment_counter(post_id, 'comment_count', -1)
 		return True
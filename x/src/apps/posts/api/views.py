@@ -2,6 +2,7 @@ from rest_framework import viewsets, status, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.urls import replace_query_param
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 
@@ -9,8 +10,16 @@ from django.views.decorators.csrf import csrf_exempt
 from src.apps.posts.schemas.post import PostSerializer, PostCreateSerializer
 from src.apps.posts.services.post_service import PostService
 from ..services.like_service import LikeService
+from ..schemas.like import LikeSerializer
 from src.apps.comments.services.comment_service import CommentService
 from src.apps.comments.schemas.comment import CommentSerializer
+from src.common.pagination import KeysetPagination
+from ..services.timeline_service import TimelineService
+
+class PostSearchPagination(KeysetPagination):
+    # Most relevant first; the id breaks ties between equally ranked posts.
+    ordering = ('-rank', '-id')
+
 
 @method_decorator(csrf_exempt, name='dispatch')
 class PostViewSet(
@@ -23,18 +32,40 @@ class PostViewSet(
 ):
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    # Actions call int(pk), so non-numeric ids must not reach them.
+    lookup_value_regex = r'\d+'
+    query_budget = {
+        'list': 5,
+        'retrieve': 5,
+        'create': 6,
+        'update': 7,
+        'partial_update': 7,
+        'destroy': 6,
+        'like': 3,
+        'likes': 3,
+        'comment': 4,
+        'comments': 3,
+        'timeline': 7,
+        'search': 5,
+    }
     
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['post', 'put', 'delete'], permission_classes=[IsAuthenticated])
     def like(self, request, pk=None):
-        post = PostService.get_post(pk=int(pk))
-        if not post:
+        # POST toggles; PUT and DELETE are idempotent like/unlike.
+        handlers = {
+            'POST': LikeService.toggle_like,
+            'PUT': LikeService.like,
+            'DELETE': LikeService.unlike,
+        }
+        result = handlers[request.method](post_id=int(pk), user=request.user)
+        if result is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        
-        liked = LikeService.toggle_like(post=post, user=request.user)
 
+        liked, count = result
         return Response({
             'liked': liked,
-            'count': post.likes.count()
+            'count': count
         }, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
@@ -53,14 +84,67 @@ class PostViewSet(
         post = PostService.get_post(pk=int(pk))
         if not post:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        comments = CommentService.list_comments_by_post(post_id=post.id)
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(CommentService.list_comments_by_post(post_id=post.id))
+        serializer = CommentSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def likes(self, request, pk=None):
+        post = PostService.get_post(pk=int(pk))
+        if not post:
+            return Response(status=status.HTTP_404_NOT_FOUND)
 
+        page = self.paginate_queryset(LikeService.list_likers(post_id=post.id))
+        serializer = LikeSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def timeline(self, request):
+        try:
+            before = int(request.query_params['before'])
+        except (KeyError, ValueError):
+            before = None
+        page_size = self.paginator.get_page_size(request)
+
+        posts, next_before = TimelineService.get_page(request.user, before=before, limit=page_size)
+        serializer = self.get_serializer(posts, many=True)
+        next_link = None
+        if next_before is not None:
+            next_link = replace_query_param(request.build_absolute_uri(), 'before', next_before)
+        return Response({'next': next_link, 'results': serializer.data})
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def search(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'Query parameter "q" is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = PostSearchPagination()
+        page = paginator.paginate_queryset(PostService.search_posts(query), request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def get_queryset(self):
         return PostService.list_posts()
 
+    @staticmethod
+    def _serialize_shared(post):
+        # Cached across viewers, so leave out per-viewer and unflushed state.
+        return dict(PostSerializer(post, context={'pending_like_deltas': {}}).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = int(kwargs.get('pk'))
+        data = PostService.get_post_data(pk, serialize=self._serialize_shared)
+        if data is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        pending = LikeService.pending_deltas([pk]).get(pk, 0)
+        return Response({
+            **data,
+            'liked_count': max(data['liked_count'] + pending, 0),
+            'is_liked': LikeService.is_liked(pk, request.user),
+        })
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
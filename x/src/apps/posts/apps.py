@@ -4,3 +4,6 @@ class PostsConfig(AppConfig):
 	default_auto_field = 'django.db.models.BigAutoField'
 	name = 'src.apps.posts'
 	verbose_name = 'Posts'
+
+	def ready(self):
+		from . import checks  # noqa: F401
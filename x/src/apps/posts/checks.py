@@ -0,0 +1,18 @@
+from django.core import checks
+from django.db import connection
+
+from .repositories.post_search_repository import SEARCH_VENDORS
+
+
+@checks.register()
+def check_search_backend(app_configs, **kwargs):
+	"""Post search only works on the databases migration 0006 builds an index for."""
+	if connection.vendor in SEARCH_VENDORS:
+		return []
+	return [
+		checks.Error(
+			f'Post search does not support the {connection.vendor} database backend.',
+			hint=f'Use one of: {", ".join(SEARCH_VENDORS)}.',
+			id='posts.E001',
+		)
+	]
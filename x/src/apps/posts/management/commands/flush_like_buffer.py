@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from src.apps.posts.services.like_service import LikeService
+
+
+class Command(BaseCommand):
+    help = 'Write buffered like/unlike intents to the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep flushing every LIKE_BUFFER_FLUSH_INTERVAL seconds.',
+        )
+
+    def handle(self, *args, loop, **options):
+        while True:
+            flushed = LikeService.flush_buffer()
+            if flushed or not loop:
+                self.stdout.write(f'Flushed {flushed} like intent(s).')
+            if not loop:
+                return
+            close_old_connections()
+            time.sleep(settings.LIKE_BUFFER_FLUSH_INTERVAL)
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from src.apps.comments.models.comment import Comment
+from src.apps.posts.models.like import Like
+from src.apps.posts.models.post import Post
+
+
+def _count_of(model):
+    counts = (
+        model.objects.filter(post=OuterRef('pk'))
+        .order_by()
+        .values('post')
+        .annotate(c=Count('*'))
+        .values('c')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recompute Post.like_count and Post.comment_count for posts whose counters drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drifted posts, do not write.',
+        )
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        drifted = (
+            Post.objects.order_by('pk')
+            .annotate(actual_likes=_count_of(Like), actual_comments=_count_of(Comment))
+            .filter(~Q(like_count=F('actual_likes')) | ~Q(comment_count=F('actual_comments')))
+            .only('pk', 'like_count', 'comment_count')
+        )
+
+        fixed = 0
+        batch = []
+        for post in drifted.iterator(chunk_size=batch_size):
+            if dry_run:
+                self.stdout.write(
+                    f'post {post.pk}: likes {post.like_count} -> {post.actual_likes}, '
+                    f'comments {post.comment_count} -> {post.actual_comments}'
+                )
+            post.like_count = post.actual_likes
+            post.comment_count = post.actual_comments
+            batch.append(post)
+            fixed += 1
+            if len(batch) >= batch_size:
+                self._flush(batch, dry_run)
+                batch = []
+        self._flush(batch, dry_run)
+
+        verb = 'Found' if dry_run else 'Reconciled'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {fixed} drifted post(s).'))
+
+    @staticmethod
+    def _flush(batch, dry_run):
+        if batch and not dry_run:
+            Post.objects.bulk_update(batch, ['like_count', 'comment_count'])
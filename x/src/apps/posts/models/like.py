@@ -18,6 +18,9 @@ class Like(models.Model):
     class Meta:
         unique_together = ('user', 'post')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['post', '-created_at', '-id'], name='like_post_recent_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user} likes {self.post}"
\ No newline at end of file
@@ -13,9 +13,14 @@ class Post(models.Model):
 	content = models.TextField()
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
+	like_count = models.PositiveIntegerField(default=0)
+	comment_count = models.PositiveIntegerField(default=0)
 
 	class Meta:
 		ordering = ['-created_at']
+		indexes = [
+			models.Index(fields=['-created_at', '-id'], name='post_feed_idx'),
+		]
 
 	def __str__(self) -> str:
 		return self.title
@@ -0,0 +1,198 @@
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+
+
+class InMemoryLikeBuffer:
+    """
+    Process-local like buffer.
+
+    ``intents`` keeps the latest desired state per ``(post_id, user_id)`` so repeated
+    taps coalesce into one row change; ``deltas`` tracks the not yet flushed change
+    of each post's ``like_count``. ``bases`` remembers the database state each intent
+    was recorded against, so an acknowledged flush can take exactly its own part
+    out of the deltas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._intents: dict[tuple[int, int], bool] = {}
+        self._bases: dict[tuple[int, int], bool] = {}
+        self._deltas: dict[int, int] = defaultdict(int)
+
+    def get_intent(self, post_id: int, user_id: int) -> bool | None:
+        with self._lock:
+            return self._intents.get((post_id, user_id))
+
+    def get_intents(self, user_id: int, post_ids) -> dict[int, bool]:
+        with self._lock:
+            return {
+                post_id: self._intents[(post_id, user_id)]
+                for post_id in post_ids
+                if (post_id, user_id) in self._intents
+            }
+
+    def record(self, post_id: int, user_id: int, liked: bool | None, persisted: bool) -> tuple[bool, int]:
+        """
+        Move the intent to ``liked`` (``None`` toggles it) and return ``(liked, pending delta)``.
+
+        ``persisted`` is the stored state, used when no intent is buffered yet. The delta
+        is taken against the current intent under the lock, so a repeated target is a no-op.
+        """
+        key = (post_id, user_id)
+        with self._lock:
+            current = self._intents.get(key, persisted)
+            target = (not current) if liked is None else liked
+            if target != current:
+                self._intents[key] = target
+                self._bases.setdefault(key, current)
+                self._deltas[post_id] += int(target) - int(current)
+                if not self._deltas[post_id]:
+                    del self._deltas[post_id]
+            return target, self._deltas.get(post_id, 0)
+
+    def get_deltas(self, post_ids) -> dict[int, int]:
+        with self._lock:
+            return {post_id: self._deltas[post_id] for post_id in post_ids if self._deltas.get(post_id)}
+
+    def flush_lock(self):
+        return self._flush_lock
+
+    def snapshot(self) -> dict[tuple[int, int], bool]:
+        with self._lock:
+            return dict(self._intents)
+
+    def ack(self, intents: dict[tuple[int, int], bool]) -> None:
+        with self._lock:
+            for key, liked in intents.items():
+                base = self._bases.get(key)
+                if base is None:
+                    continue
+                post_id = key[0]
+                self._deltas[post_id] -= int(liked) - int(base)
+                if not self._deltas[post_id]:
+                    del self._deltas[post_id]
+                if self._intents.get(key) == liked:
+                    del self._intents[key]
+                    del self._bases[key]
+                else:
+                    # Changed again while flushing: what was written is the new base.
+                    self._bases[key] = liked
+
+
+class RedisLikeBuffer:
+    """
+    Like buffer shared by every worker; hashes for intents, their bases and count deltas.
+
+    Recording an intent and acknowledging a flush each run as one Lua script, so they
+    cannot interleave with each other.
+    """
+
+    INTENTS_KEY = 'likebuf:intents'
+    BASES_KEY = 'likebuf:bases'
+    DELTAS_KEY = 'likebuf:deltas'
+    FLUSH_LOCK_KEY = 'likebuf:flush'
+    # Lets another flusher take over if the holder dies mid-flush.
+    FLUSH_LOCK_TIMEOUT = 60
+
+    RECORD_SCRIPT = """
+    local current = redis.call('HGET', KEYS[1], ARGV[1]) or ARGV[4]
+    local target = ARGV[3]
+    if target == 't' then
+        target = (current == '1') and '0' or '1'
+    end
+    if target ~= current then
+        redis.call('HSET', KEYS[1], ARGV[1], target)
+        redis.call('HSETNX', KEYS[2], ARGV[1], current)
+        local pending = redis.call('HINCRBY', KEYS[3], ARGV[2], tonumber(target) - tonumber(current))
+        if pending == 0 then
+            redis.call('HDEL', KEYS[3], ARGV[2])
+        end
+    end
+    return {tonumber(target), tonumber(redis.call('HGET', KEYS[3], ARGV[2]) or '0')}
+    """
+
+    ACK_SCRIPT = """
+    for i = 1, #ARGV, 2 do
+        local field, liked = ARGV[i], ARGV[i + 1]
+        local base = redis.call('HGET', KEYS[2], field)
+        if base then
+            local post_id = string.match(field, '^(%d+):')
+            local left = redis.call('HINCRBY', KEYS[3], post_id, tonumber(base) - tonumber(liked))
+            if left == 0 then
+                redis.call('HDEL', KEYS[3], post_id)
+            end
+            if redis.call('HGET', KEYS[1], field) == liked then
+                redis.call('HDEL', KEYS[1], field)
+                redis.call('HDEL', KEYS[2], field)
+            else
+                redis.call('HSET', KEYS[2], field, liked)
+            end
+        end
+    end
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self._record = self.client.register_script(self.RECORD_SCRIPT)
+        self._ack = self.client.register_script(self.ACK_SCRIPT)
+
+    @staticmethod
+    def field(post_id: int, user_id: int) -> str:
+        return f'{post_id}:{user_id}'
+
+    def get_intent(self, post_id: int, user_id: int) -> bool | None:
+        value = self.client.hget(self.INTENTS_KEY, self.field(post_id, user_id))
+        return None if value is None else value == b'1'
+
+    def get_intents(self, user_id: int, post_ids) -> dict[int, bool]:
+        post_ids = list(post_ids)
+        if not post_ids:
+            return {}
+        values = self.client.hmget(self.INTENTS_KEY, [self.field(post_id, user_id) for post_id in post_ids])
+        return {post_id: value == b'1' for post_id, value in zip(post_ids, values) if value is not None}
+
+    def record(self, post_id: int, user_id: int, liked: bool | None, persisted: bool) -> tuple[bool, int]:
+        """Same contract as ``InMemoryLikeBuffer.record``, decided atomically in Lua."""
+        target = 't' if liked is None else int(liked)
+        liked, pending = self._record(
+            keys=[self.INTENTS_KEY, self.BASES_KEY, self.DELTAS_KEY],
+            args=[self.field(post_id, user_id), post_id, target, int(persisted)],
+        )
+        return bool(liked), int(pending)
+
+    def get_deltas(self, post_ids) -> dict[int, int]:
+        post_ids = list(post_ids)
+        if not post_ids:
+            return {}
+        values = self.client.hmget(self.DELTAS_KEY, post_ids)
+        return {post_id: int(value) for post_id, value in zip(post_ids, values) if value and int(value)}
+
+    def flush_lock(self):
+        return self.client.lock(self.FLUSH_LOCK_KEY, timeout=self.FLUSH_LOCK_TIMEOUT)
+
+    def snapshot(self) -> dict[tuple[int, int], bool]:
+        intents = {}
+        for field, value in self.client.hgetall(self.INTENTS_KEY).items():
+            post_id, user_id = field.decode().split(':')
+            intents[(int(post_id), int(user_id))] = value == b'1'
+        return intents
+
+    def ack(self, intents: dict[tuple[int, int], bool]) -> None:
+        args = []
+        for (post_id, user_id), liked in intents.items():
+            args += [self.field(post_id, user_id), int(liked)]
+        if args:
+            self._ack(keys=[self.INTENTS_KEY, self.BASES_KEY, self.DELTAS_KEY], args=args)
+
+
+@lru_cache(maxsize=None)
+def get_like_buffer():
+    if settings.LIKE_BUFFER_BACKEND == 'redis':
+        return RedisLikeBuffer(settings.LIKE_BUFFER_REDIS_URL)
+    return InMemoryLikeBuffer()
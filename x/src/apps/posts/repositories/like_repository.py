@@ -1,6 +1,43 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
 from typing import Any
 
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Coalesce, Greatest, RowNumber
+from django.utils import timezone
+
 from ..models.like import Like
+from ..models.post import Post
+
+
+def _like_sql(*, delete: bool, insert: bool) -> str:
+    """
+    One statement that removes and/or adds the like row and moves ``like_count``
+    by the number of rows actually touched, returning the new count.
+    """
+    like_table = connection.ops.quote_name(Like._meta.db_table)
+    post_table = connection.ops.quote_name(Post._meta.db_table)
+    if delete:
+        deleted = f"DELETE FROM {like_table} WHERE post_id = %(post_id)s AND user_id = %(user_id)s RETURNING 1"
+    else:
+        deleted = "SELECT 1 WHERE false"
+    if insert:
+        inserted = (
+            f"INSERT INTO {like_table} (post_id, user_id, created_at) "
+            f"SELECT %(post_id)s, %(user_id)s, %(now)s WHERE NOT EXISTS (SELECT 1 FROM deleted) "
+            f"ON CONFLICT DO NOTHING RETURNING 1"
+        )
+    else:
+        inserted = "SELECT 1 WHERE false"
+    return (
+        f"WITH deleted AS ({deleted}), inserted AS ({inserted}) "
+        f"UPDATE {post_table} SET like_count = GREATEST("
+        f"like_count + (SELECT count(*) FROM inserted) - (SELECT count(*) FROM deleted), 0) "
+        f"WHERE id = %(post_id)s "
+        f"RETURNING like_count, (SELECT count(*) FROM inserted), (SELECT count(*) FROM deleted)"
+    )
 
 
 class LikeRepository:
@@ -19,6 +56,112 @@ class LikeRepository:
     def delete(like):
         return like.delete()
     
+    @staticmethod
+    def apply(post_id: int, user_id: int, *, delete: bool, insert: bool) -> tuple[int, int, int]|None:
+        """
+        Atomically delete and/or insert the (post, user) like.
+
+        Returns ``(like_count, inserted, deleted)`` or ``None`` if the post does not exist.
+        """
+        if connection.vendor != 'postgresql':
+            return LikeRepository._apply_portable(post_id, user_id, delete=delete, insert=insert)
+        params = {'post_id': post_id, 'user_id': user_id, 'now': timezone.now()}
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(_like_sql(delete=delete, insert=insert), params)
+                return cursor.fetchone()
+        except IntegrityError:
+            # The post vanished between routing and the insert.
+            return None
+
+    @staticmethod
+    def _apply_portable(post_id: int, user_id: int, *, delete: bool, insert: bool) -> tuple[int, int, int]|None:
+        with transaction.atomic():
+            if not Post.objects.select_for_update().filter(pk=post_id).exists():
+                return None
+            deleted = 0
+            if delete:
+                deleted, _ = Like.objects.filter(post_id=post_id, user_id=user_id).delete()
+            inserted = 0
+            if insert and not deleted:
+                _, created = Like.objects.get_or_create(post_id=post_id, user_id=user_id)
+                inserted = int(created)
+            if inserted != deleted:
+                Post.objects.filter(pk=post_id).update(
+                    like_count=Greatest(F('like_count') + inserted - deleted, 0)
+                )
+            like_count = Post.objects.filter(pk=post_id).values_list('like_count', flat=True).get()
+        return like_count, inserted, deleted
+
+    @staticmethod
+    def apply_batch(intents: dict[tuple[int, int], bool], batch_size: int = 1000) -> set[int]:
+        """
+        Persist coalesced like intents in bulk and recount the affected posts.
+
+        Intents for posts or users that no longer exist are skipped. Returns the IDs of
+        the posts whose ``like_count`` was recomputed.
+        """
+        user_model = Like._meta.get_field('user').related_model
+        with transaction.atomic():
+            post_ids = set(
+                Post.objects.filter(pk__in={post_id for post_id, _ in intents}).values_list('pk', flat=True)
+            )
+            user_ids = set(
+                user_model.objects.filter(pk__in={user_id for _, user_id in intents}).values_list('pk', flat=True)
+            )
+            adds = [
+                (post_id, user_id) for (post_id, user_id), liked in intents.items()
+                if liked and post_id in post_ids and user_id in user_ids
+            ]
+            removes = [key for key, liked in intents.items() if not liked and key[0] in post_ids]
+            Like.objects.bulk_create(
+                [Like(post_id=post_id, user_id=user_id) for post_id, user_id in adds],
+                ignore_conflicts=True,
+                batch_size=batch_size,
+            )
+            for start in range(0, len(removes), batch_size):
+                chunk = removes[start:start + batch_size]
+                Like.objects.filter(
+                    reduce(or_, (Q(post_id=post_id, user_id=user_id) for post_id, user_id in chunk))
+                ).delete()
+            counts = (
+                Like.objects.filter(post=OuterRef('pk'))
+                .order_by()
+                .values('post')
+                .annotate(c=Count('*'))
+                .values('c')
+            )
+            Post.objects.filter(pk__in=post_ids).update(like_count=Coalesce(Subquery(counts), 0))
+        return post_ids
+
     @staticmethod
     def list_likes(post):
         return Like.objects.filter(post=post)
+
+    @staticmethod
+    def liked_post_ids(user, post_ids) -> set[int]:
+        return set(
+            Like.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', flat=True)
+        )
+
+    @staticmethod
+    def list_likers(post_id: int):
+        return Like.objects.filter(post_id=post_id).select_related('user')
+
+    @staticmethod
+    def recent_usernames(post_ids, limit: int) -> dict[int, list[str]]:
+        rows = (
+            Like.objects.filter(post_id__in=post_ids)
+            .annotate(rank=Window(
+                RowNumber(),
+                partition_by=F('post_id'),
+                order_by=[F('created_at').desc(), F('id').desc()],
+            ))
+            .filter(rank__lte=limit)
+            .order_by('post_id', 'rank')
+            .values_list('post_id', 'user__username')
+        )
+        previews = defaultdict(list)
+        for post_id, username in rows:
+            previews[post_id].append(username)
+        return previews
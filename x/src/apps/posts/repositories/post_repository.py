@@ -1,19 +1,79 @@
+from __future__ import annotations
+
 from typing import Any
 
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
 from src.apps.posts.models.post import Post
 
+CACHE_TTL = 300
+# Bump whenever the cached Post shape or PostSerializer output changes.
+CACHE_VERSION = 2
+# Cached instances are pickled into the shared cache, so they never carry these.
+PRIVATE_AUTHOR_FIELDS = (
+	'author__password',
+	'author__email',
+	'author__first_name',
+	'author__last_name',
+	'author__date_of_birth',
+	'author__last_login',
+)
+
+
+def _cache_key(pk: int) -> str:
+	return f'post:{pk}'
+
+
+def _data_cache_key(pk: int) -> str:
+	return f'post:{pk}:data'
+
 
 class PostRepository:
 	@staticmethod
 	def list():
-		return Post.objects.prefetch_related('likes__user').all()
+		return Post.objects.select_related('author').all()
 
 	@staticmethod
 	def get(pk: int) -> Post|None:
+		post = cache.get(_cache_key(pk), version=CACHE_VERSION)
+		if post is not None:
+			return post
 		try:
-			return Post.objects.get(pk=pk)
+			post = Post.objects.select_related('author').defer(*PRIVATE_AUTHOR_FIELDS).get(pk=pk)
 		except Post.DoesNotExist:
 			return None
+		cache.set(_cache_key(pk), post, CACHE_TTL, version=CACHE_VERSION)
+		return post
+
+	@staticmethod
+	def get_cached_data(pk: int) -> dict|None:
+		return cache.get(_data_cache_key(pk), version=CACHE_VERSION)
+
+	@staticmethod
+	def set_cached_data(pk: int, data: dict) -> None:
+		cache.set(_data_cache_key(pk), data, CACHE_TTL, version=CACHE_VERSION)
+
+	@staticmethod
+	def invalidate(pk: int) -> None:
+		keys = [_cache_key(pk), _data_cache_key(pk)]
+		cache.delete_many(keys, version=CACHE_VERSION)
+		# Drop again after commit so a reader can't re-cache pre-commit state.
+		transaction.on_commit(lambda: cache.delete_many(keys, version=CACHE_VERSION))
+
+	@staticmethod
+	def get_many(pks: list[int]) -> list[Post]:
+		posts = Post.objects.select_related('author').in_bulk(pks)
+		return [posts[pk] for pk in pks if pk in posts]
+
+	@staticmethod
+	def recent_ids_by_authors(author_ids: list[int], before: int | None, limit: int) -> list[int]:
+		qs = Post.objects.filter(author_id__in=author_ids)
+		if before is not None:
+			qs = qs.filter(pk__lt=before)
+		return list(qs.order_by('-pk').values_list('pk', flat=True)[:limit])
 
 	@staticmethod
 	def create(*, data: dict[str, Any], author) -> Post:
@@ -23,9 +83,18 @@ class PostRepository:
 	def update(instance: Post, data: dict[str, Any]) -> Post:
 		for k, v in data.items():
 			setattr(instance, k, v)
-		instance.save()
+		# The instance may come from cache, so never write back its stale counters.
+		instance.save(update_fields=[*data.keys(), 'updated_at'])
+		PostRepository.invalidate(instance.pk)
 		return instance
 
 	@staticmethod
 	def delete(instance: Post) -> None:
+		pk = instance.pk
 		instance.delete()
+		PostRepository.invalidate(pk)
+
+	@staticmethod
+	def increment_counter(pk: int, field: str, delta: int = 1) -> None:
+		Post.objects.filter(pk=pk).update(**{field: Greatest(F(field) + delta, 0)})
+		PostRepository.invalidate(pk)
@@ -0,0 +1,71 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from src.common.exceptions import NotImplementedException
+
+from ..models.post import Post
+
+# Language-agnostic: no stemming, so Russian and English posts are indexed alike.
+SEARCH_CONFIG = 'simple'
+FTS_TABLE = 'posts_post_fts'
+MAX_QUERY_LENGTH = 200
+# Backends migration 0006 builds an index for.
+SEARCH_VENDORS = ('postgresql', 'sqlite')
+
+_TOKEN = re.compile(r'\w+')
+
+
+class PostSearchRepository:
+	"""
+	Ranked full-text search over post titles and content, titles weighing more.
+
+	PostgreSQL matches the generated ``search_vector`` column through its GIN index;
+	SQLite uses the ``posts_post_fts`` FTS5 table that triggers keep in sync. Both are
+	created by migration 0006. Other backends fail the ``posts.E001`` system check and
+	answer 501.
+	"""
+
+	@staticmethod
+	def search(query: str):
+		"""Posts matching ``query``, annotated with ``rank`` (higher is more relevant)."""
+		query = query[:MAX_QUERY_LENGTH]
+		if connection.vendor == 'postgresql':
+			return PostSearchRepository._search_postgresql(query)
+		if connection.vendor == 'sqlite':
+			return PostSearchRepository._search_sqlite(query)
+		raise NotImplementedException(f'Post search is not available on {connection.vendor}.')
+
+	@staticmethod
+	def _search_postgresql(query: str):
+		table = connection.ops.quote_name(Post._meta.db_table)
+		tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+		return (
+			Post.objects.select_related('author')
+			.filter(RawSQL(f'{table}.search_vector @@ {tsquery}', [query], output_field=BooleanField()))
+			# float8 so the rank survives the round trip through a cursor unchanged
+			.annotate(rank=RawSQL(f'ts_rank_cd({table}.search_vector, {tsquery})::float8', [query], output_field=FloatField()))
+		)
+
+	@staticmethod
+	def _search_sqlite(query: str):
+		tokens = _TOKEN.findall(query)
+		if not tokens:
+			return Post.objects.none()
+		# Quoted terms, so user input can never be parsed as FTS5 syntax.
+		match = ' '.join('"{}"'.format(token) for token in tokens)
+		table = connection.ops.quote_name(Post._meta.db_table)
+		return (
+			Post.objects.select_related('author')
+			.filter(RawSQL(
+				f'{table}.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+				[match], output_field=BooleanField(),
+			))
+			.annotate(rank=RawSQL(
+				f'(SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+				f'WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id)',
+				[match], output_field=FloatField(),
+			))
+		)
@@ -0,0 +1,89 @@
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+
+
+class InMemoryTimelineStore:
+	"""Process-local stand-in for the Redis store, used in tests and local development."""
+
+	def __init__(self, max_length: int):
+		self.max_length = max_length
+		self._lock = threading.Lock()
+		self._timelines: dict[int, list[int]] = defaultdict(list)
+
+	def push(self, user_ids, post_id: int) -> None:
+		with self._lock:
+			for user_id in user_ids:
+				timeline = self._timelines[user_id]
+				if post_id not in timeline:
+					timeline.append(post_id)
+					timeline.sort(reverse=True)
+					del timeline[self.max_length:]
+
+	def remove(self, user_ids, post_id: int) -> None:
+		with self._lock:
+			for user_id in user_ids:
+				timeline = self._timelines.get(user_id)
+				if timeline and post_id in timeline:
+					timeline.remove(post_id)
+
+	def range(self, user_id: int, before: int | None, limit: int) -> list[int]:
+		with self._lock:
+			timeline = self._timelines.get(user_id, [])
+			return [pk for pk in timeline if before is None or pk < before][:limit]
+
+	def clear(self) -> None:
+		with self._lock:
+			self._timelines.clear()
+
+
+class RedisTimelineStore:
+	"""
+	One sorted set per user, scored by post ID so that ordering and cursors come for free.
+
+	Sets are trimmed to ``max_length`` on every push; older history is served from the
+	database by the fan-out-on-read path.
+	"""
+
+	def __init__(self, url: str, max_length: int):
+		import redis
+
+		self.client = redis.Redis.from_url(url)
+		self.max_length = max_length
+
+	@staticmethod
+	def key(user_id: int) -> str:
+		return f'timeline:{user_id}'
+
+	def push(self, user_ids, post_id: int) -> None:
+		pipe = self.client.pipeline(transaction=False)
+		for user_id in user_ids:
+			key = self.key(user_id)
+			pipe.zadd(key, {post_id: post_id})
+			pipe.zremrangebyrank(key, 0, -self.max_length - 1)
+		pipe.execute()
+
+	def remove(self, user_ids, post_id: int) -> None:
+		pipe = self.client.pipeline(transaction=False)
+		for user_id in user_ids:
+			pipe.zrem(self.key(user_id), post_id)
+		pipe.execute()
+
+	def range(self, user_id: int, before: int | None, limit: int) -> list[int]:
+		upper = f'({before}' if before is not None else '+inf'
+		ids = self.client.zrevrangebyscore(self.key(user_id), upper, '-inf', start=0, num=limit)
+		return [int(pk) for pk in ids]
+
+	def clear(self) -> None:
+		for key in self.client.scan_iter(match='timeline:*'):
+			self.client.delete(key)
+
+
+@lru_cache(maxsize=None)
+def get_timeline_store():
+	max_length = settings.TIMELINE_MAX_LENGTH
+	if settings.TIMELINE_BACKEND == 'redis':
+		return RedisTimelineStore(settings.TIMELINE_REDIS_URL, max_length)
+	return InMemoryTimelineStore(max_length)
@@ -3,8 +3,9 @@ from ..models.like import Like
 
 class LikeSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
+    username = serializers.CharField(source='user.username', read_only=True)
     
     class Meta:
         model = Like
-        fields = ['id', 'post', 'user', 'created_at']
+        fields = ['id', 'post', 'user', 'username', 'created_at']
         read_only_fields = ['id', 'created_at']
\ No newline at end of file
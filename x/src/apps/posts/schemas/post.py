@@ -1,12 +1,37 @@
+from django.db import models
 from rest_framework import serializers
 
 from src.apps.posts.models.post import Post
+from src.apps.posts.services.like_service import LikeService
+from src.apps.comments.services.comment_service import CommentService
+
+PREVIEW_SIZE = 3
+
+
+class PostListSerializer(serializers.ListSerializer):
+	"""Resolves page-wide lookups once instead of once per post."""
+
+	liked_post_ids: set[int] | None = None
+	pending_like_deltas: dict[int, int] | None = None
+	liked_by: dict[int, list[str]] | None = None
+	commented_by: dict[int, list[str]] | None = None
+
+	def to_representation(self, data):
+		posts = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+		post_ids = [post.pk for post in posts]
+		request = self.context.get('request')
+		if request and request.user.is_authenticated:
+			self.liked_post_ids = LikeService.liked_post_ids(request.user, post_ids)
+		self.pending_like_deltas = LikeService.pending_deltas(post_ids)
+		self.liked_by = LikeService.recent_usernames(post_ids, PREVIEW_SIZE)
+		self.commented_by = CommentService.recent_commenters(post_ids, PREVIEW_SIZE)
+		return super().to_representation(posts)
 
 
 class PostSerializer(serializers.ModelSerializer):
-	liked_count = serializers.IntegerField(source='likes.count', read_only=True)
+	liked_count = serializers.SerializerMethodField()
 	liked_by = serializers.SerializerMethodField()
-	comment_count = serializers.IntegerField(source='comments.count', read_only=True)
+	comment_count = serializers.IntegerField(read_only=True)
 	commented_by = serializers.SerializerMethodField()
 	author_username = serializers.CharField(source='author.username', read_only=True)
 	is_liked = serializers.SerializerMethodField()
@@ -14,14 +39,31 @@ class PostSerializer(serializers.ModelSerializer):
 		model = Post
 		fields = ['id', 'author', 'author_username', 'title', 'content', 'created_at', 'updated_at', 'liked_count', 'liked_by','comment_count','commented_by', 'is_liked']
 		read_only_fields = ['id', 'created_at', 'updated_at']
+		list_serializer_class = PostListSerializer
   
+	def get_liked_count(self, obj):
+		deltas = getattr(self.parent, 'pending_like_deltas', None)
+		if deltas is None:
+			deltas = self.context.get('pending_like_deltas')
+		if deltas is None:
+			deltas = LikeService.pending_deltas([obj.pk])
+		return max(obj.like_count + deltas.get(obj.pk, 0), 0)
 	def get_liked_by(self, obj):
-		return [like.user.username for like in obj.likes.all()]
+		previews = getattr(self.parent, 'liked_by', None)
+		if previews is None:
+			previews = LikeService.recent_usernames([obj.pk], PREVIEW_SIZE)
+		return previews.get(obj.pk, [])
 	def get_commented_by(self, obj):
-		return [comment.author.username for comment in obj.comments.all()]
+		previews = getattr(self.parent, 'commented_by', None)
+		if previews is None:
+			previews = CommentService.recent_commenters([obj.pk], PREVIEW_SIZE)
+		return previews.get(obj.pk, [])
 	def get_is_liked(self, obj):
 		request = self.context.get('request')
 		if request and request.user.is_authenticated:
+			liked_post_ids = getattr(self.parent, 'liked_post_ids', None)
+			if liked_post_ids is not None:
+				return obj.pk in liked_post_ids
 			return obj.likes.filter(user=request.user).exists()
 		return False
 
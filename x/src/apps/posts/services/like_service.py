@@ -1,15 +1,134 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections
+
+from ..repositories.like_buffer import get_like_buffer
 from ..repositories.like_repository import LikeRepository
+from ..repositories.post_repository import PostRepository
+
+logger = logging.getLogger(__name__)
+
+_flusher_lock = threading.Lock()
+_flusher: threading.Thread | None = None
+
+
+def _flush_forever():
+    while True:
+        time.sleep(settings.LIKE_BUFFER_FLUSH_INTERVAL)
+        try:
+            LikeService.flush_buffer()
+        except Exception:
+            logger.exception('Like buffer flush failed')
+        finally:
+            close_old_connections()
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_forever, name='like-buffer-flusher', daemon=True)
+            _flusher.start()
+
 
 class LikeService:
     @staticmethod
-    def toggle_like(post, user):
-        like = LikeRepository.get(post, user)
-        if like:
-            LikeRepository.delete(like)
-            return False
-        LikeRepository.create(post, user)
-        return True
+    def _apply(post_id: int, user, *, delete: bool, insert: bool) -> tuple[bool, int]|None:
+        if settings.LIKE_BUFFER_ENABLED:
+            return LikeService._apply_buffered(post_id, user, delete=delete, insert=insert)
+        result = LikeRepository.apply(post_id, user.id, delete=delete, insert=insert)
+        if result is None:
+            return None
+        like_count, inserted, deleted = result
+        if inserted or deleted:
+            PostRepository.invalidate(post_id)
+        liked = bool(inserted) or (insert and not deleted)
+        return liked, like_count
+    @staticmethod
+    def _apply_buffered(post_id: int, user, *, delete: bool, insert: bool) -> tuple[bool, int]|None:
+        """Record the intent in the like buffer; the row change is written by the next flush."""
+        post = PostRepository.get(pk=post_id)
+        if not post:
+            return None
+        buffer = get_like_buffer()
+        # Once an intent is flushed and dropped, the database holds that same state.
+        persisted = buffer.get_intent(post_id, user.id)
+        if persisted is None:
+            persisted = bool(LikeRepository.liked_post_ids(user, [post_id]))
+        target, pending = buffer.record(post_id, user.id, None if (delete and insert) else insert, persisted)
+        _ensure_flusher()
+        return target, max(post.like_count + pending, 0)
+    @staticmethod
+    def flush_buffer() -> int:
+        """
+        Write buffered likes to the database; returns the number of intents flushed.
+
+        Intents leave the buffer only after their transaction commits, so a failed flush
+        is simply retried by the next one and reads in between keep seeing them.
+        """
+        buffer = get_like_buffer()
+        with buffer.flush_lock():
+            intents = buffer.snapshot()
+            if not intents:
+                return 0
+            try:
+                post_ids = LikeRepository.apply_batch(intents, batch_size=settings.LIKE_BUFFER_BATCH_SIZE)
+            except IntegrityError:
+                # A post or user was deleted mid-flush; keep it from holding back the rest.
+                post_ids = set()
+                for key, liked in intents.items():
+                    try:
+                        post_ids |= LikeRepository.apply_batch({key: liked})
+                    except IntegrityError:
+                        logger.warning('Dropping like intent %s that no longer applies', key, exc_info=True)
+            buffer.ack(intents)
+        for post_id in post_ids:
+            PostRepository.invalidate(post_id)
+        return len(intents)
+    @staticmethod
+    def pending_deltas(post_ids) -> dict[int, int]:
+        """Unflushed ``like_count`` changes per post; empty unless buffering is on."""
+        if not settings.LIKE_BUFFER_ENABLED or not post_ids:
+            return {}
+        return get_like_buffer().get_deltas(post_ids)
+    @staticmethod
+    def toggle_like(post_id: int, user) -> tuple[bool, int]|None:
+        """Flip the like in one statement; returns ``(liked, like_count)`` or ``None`` for a missing post."""
+        return LikeService._apply(post_id, user, delete=True, insert=True)
+    @staticmethod
+    def like(post_id: int, user) -> tuple[bool, int]|None:
+        return LikeService._apply(post_id, user, delete=False, insert=True)
+    @staticmethod
+    def unlike(post_id: int, user) -> tuple[bool, int]|None:
+        return LikeService._apply(post_id, user, delete=True, insert=False)
     @staticmethod
     def list_likes(post):
         return LikeRepository.list_likes(post)
-    
\ No newline at end of file
+    @staticmethod
+    def liked_post_ids(user, post_ids) -> set[int]:
+        if not post_ids:
+            return set()
+        liked = LikeRepository.liked_post_ids(user, post_ids)
+        if settings.LIKE_BUFFER_ENABLED:
+            for post_id, intent in get_like_buffer().get_intents(user.id, post_ids).items():
+                if intent:
+                    liked.add(post_id)
+                else:
+                    liked.discard(post_id)
+        return liked
+    @staticmethod
+    def is_liked(post_id: int, user) -> bool:
+        return post_id in LikeService.liked_post_ids(user, [post_id])
+    @staticmethod
+    def list_likers(post_id: int):
+        return LikeRepository.list_likers(post_id)
+    @staticmethod
+    def recent_usernames(post_ids, limit: int) -> dict[int, list[str]]:
+        if not post_ids:
+            return {}
+        return LikeRepository.recent_usernames(post_ids, limit)
\ No newline at end of file
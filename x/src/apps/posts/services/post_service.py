@@ -1,6 +1,8 @@
 from typing import Any
 
 from src.apps.posts.repositories.post_repository import PostRepository
+from src.apps.posts.repositories.post_search_repository import PostSearchRepository
+from src.apps.posts.services.timeline_service import TimelineService
 from src.apps.posts.models.post import Post
 
 
@@ -9,13 +11,33 @@ class PostService:
 	def list_posts():
 		return PostRepository.list()
 
+	@staticmethod
+	def search_posts(query: str):
+		"""Posts matching ``query``, annotated with ``rank`` for ordering by relevance."""
+		return PostSearchRepository.search(query)
+
 	@staticmethod
 	def get_post(pk: int) -> Post|None:
 		return PostRepository.get(pk=pk)
 
+	@staticmethod
+	def get_post_data(pk: int, serialize) -> dict|None:
+		"""Viewer-independent representation of a post, served from cache when hot."""
+		data = PostRepository.get_cached_data(pk)
+		if data is not None:
+			return data
+		post = PostRepository.get(pk=pk)
+		if not post:
+			return None
+		data = serialize(post)
+		PostRepository.set_cached_data(pk, data)
+		return data
+
 	@staticmethod
 	def create_post(*, data: dict[str, Any], author) -> Post:
-		return PostRepository.create(data=data, author=author)
+		post = PostRepository.create(data=data, author=author)
+		TimelineService.on_post_created(post)
+		return post
 
 	@staticmethod
 	def update_post(pk: int, data: dict[str, Any], user) -> Post|None:
@@ -29,5 +51,6 @@ class PostService:
 		instance = PostRepository.get(pk=pk)
 		if not instance or instance.author != user:
 			return False
+		TimelineService.on_post_deleted(instance)
 		PostRepository.delete(instance)
 		return True
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.db import transaction
+
+from src.apps.posts.models.post import Post
+from src.apps.posts.repositories.post_repository import PostRepository
+from src.apps.posts.repositories.timeline_repository import get_timeline_store
+from src.apps.users.services.follow_service import FollowService
+
+
+class TimelineService:
+	"""
+	Per-user home timelines materialized on write.
+
+	A new post is pushed into the timeline of everyone in its audience once the
+	creating transaction commits. Authors whose audience exceeds
+	``TIMELINE_FANOUT_LIMIT`` are skipped on write and merged in on read instead.
+	"""
+
+	@staticmethod
+	def is_pulled(author) -> bool:
+		return author.follower_count > settings.TIMELINE_FANOUT_LIMIT
+
+	@staticmethod
+	def audience_ids(author) -> list[int]:
+		"""Users whose timeline should receive ``author``'s posts."""
+		if TimelineService.is_pulled(author):
+			return [author.pk]
+		return [author.pk, *FollowService().get_follower_ids(author.pk)]
+
+	@staticmethod
+	def pulled_author_ids(user) -> list[int]:
+		"""Authors ``user`` reads from whose posts are not fanned out on write."""
+		return FollowService().get_followee_ids(user.pk, min_followers=settings.TIMELINE_FANOUT_LIMIT)
+
+	@staticmethod
+	def on_post_created(post: Post) -> None:
+		audience = TimelineService.audience_ids(post.author)
+		post_id = post.pk
+		transaction.on_commit(lambda: get_timeline_store().push(audience, post_id))
+
+	@staticmethod
+	def on_post_deleted(post: Post) -> None:
+		audience = TimelineService.audience_ids(post.author)
+		post_id = post.pk
+		transaction.on_commit(lambda: get_timeline_store().remove(audience, post_id))
+
+	@staticmethod
+	def get_page(user, before: int | None, limit: int) -> tuple[list[Post], int | None]:
+		"""
+		Up to ``limit`` timeline posts older than ``before``, plus the cursor for the next
+		page (``None`` on the last one).
+
+		When the stored timeline runs short, because it is cold, empty or trimmed, the
+		page is filled from the database across everyone ``user`` follows.
+		"""
+		post_ids = get_timeline_store().range(user.pk, before, limit)
+		if len(post_ids) < limit:
+			authors = [user.pk, *FollowService().get_followee_ids(user.pk)]
+			post_ids = PostRepository.recent_ids_by_authors(authors, before, limit)
+		else:
+			pulled = TimelineService.pulled_author_ids(user)
+			if pulled:
+				post_ids = sorted(
+					set(post_ids) | set(PostRepository.recent_ids_by_authors(pulled, before, limit)),
+					reverse=True,
+				)[:limit]
+		# Decided on the IDs, so posts deleted since they were pushed don't end paging early.
+		next_before = post_ids[-1] if len(post_ids) == limit else None
+		return PostRepository.get_many(post_ids), next_before
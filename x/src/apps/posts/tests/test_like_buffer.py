@@ -0,0 +1,55 @@
+"""
+Like buffer tests
+"""
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from src.apps.posts.models import Post
+from src.apps.posts.models.like import Like
+from src.apps.posts.repositories.like_buffer import InMemoryLikeBuffer, get_like_buffer
+from src.apps.posts.services.like_service import LikeService
+from src.apps.users.models import User
+
+
+class InMemoryLikeBufferTests(SimpleTestCase):
+	def test_repeated_target_is_recorded_once(self):
+		buffer = InMemoryLikeBuffer()
+		self.assertEqual(buffer.record(1, 7, True, persisted=False), (True, 1))
+		self.assertEqual(buffer.record(1, 7, True, persisted=False), (True, 1))
+		self.assertEqual(buffer.get_deltas([1]), {1: 1})
+
+		buffer.ack(buffer.snapshot())
+		self.assertEqual(buffer.get_deltas([1]), {})
+		self.assertEqual(buffer.snapshot(), {})
+
+	def test_toggle_back_cancels_out(self):
+		buffer = InMemoryLikeBuffer()
+		self.assertEqual(buffer.record(1, 7, None, persisted=True), (False, -1))
+		self.assertEqual(buffer.record(1, 7, None, persisted=True), (True, 0))
+
+		buffer.ack(buffer.snapshot())
+		self.assertEqual(buffer.get_deltas([1]), {})
+		self.assertEqual(buffer.snapshot(), {})
+
+
+# The background flusher is kept out of the way so the test flushes deterministically.
+@mock.patch('src.apps.posts.services.like_service._ensure_flusher')
+@override_settings(LIKE_BUFFER_ENABLED=True, LIKE_BUFFER_BACKEND='memory')
+class BufferedLikeTests(TestCase):
+	def setUp(self):
+		get_like_buffer.cache_clear()
+		self.addCleanup(get_like_buffer.cache_clear)
+		self.user = User.objects.create_user(username='alice', email='alice@example.com', password='password')
+		self.post = Post.objects.create(author=self.user, title='Post', content='Content')
+
+	def test_repeated_like_counts_once_and_settles_on_flush(self, _ensure_flusher):
+		self.assertEqual(LikeService.like(post_id=self.post.pk, user=self.user), (True, 1))
+		self.assertEqual(LikeService.like(post_id=self.post.pk, user=self.user), (True, 1))
+		self.assertEqual(LikeService.pending_deltas([self.post.pk]), {self.post.pk: 1})
+
+		self.assertEqual(LikeService.flush_buffer(), 1)
+		self.assertEqual(LikeService.pending_deltas([self.post.pk]), {})
+		self.post.refresh_from_db()
+		self.assertEqual(self.post.like_count, 1)
+		self.assertEqual(Like.objects.filter(post=self.post).count(), 1)
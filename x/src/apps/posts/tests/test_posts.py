@@ -0,0 +1,47 @@
+"""
+Post tests
+"""
+import pickle
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.test import APITestCase
+
+from src.apps.posts.checks import check_search_backend
+from src.apps.posts.models import Post
+from src.apps.posts.repositories.post_repository import PostRepository
+from src.apps.users.models import User
+
+
+class PostCacheTests(APITestCase):
+	def setUp(self):
+		cache.clear()
+		self.user = User.objects.create_user(username='alice', email='alice@example.com', password='password')
+		self.post = Post.objects.create(author=self.user, title='Post', content='Content')
+		self.client.force_authenticate(self.user)
+
+	def test_cached_post_leaves_out_author_credentials(self):
+		post = PostRepository.get(pk=self.post.pk)
+		self.assertEqual(post.author.username, 'alice')
+		self.assertIn('password', post.author.get_deferred_fields())
+		self.assertNotIn(self.user.password.encode(), pickle.dumps(PostRepository.get(pk=self.post.pk)))
+
+	def test_non_numeric_id_is_not_found(self):
+		self.assertEqual(self.client.get('/api/posts/abc/').status_code, 404)
+		self.assertEqual(self.client.post('/api/posts/abc/like/').status_code, 404)
+
+
+class UnsupportedSearchBackendTests(APITestCase):
+	def setUp(self):
+		user = User.objects.create_user(username='alice', email='alice@example.com', password='password')
+		self.client.force_authenticate(user)
+		vendor = mock.patch.object(connections['default'], 'vendor', 'mysql')
+		vendor.start()
+		self.addCleanup(vendor.stop)
+
+	def test_system_check_fails(self):
+		self.assertEqual([error.id for error in check_search_backend(None)], ['posts.E001'])
+
+	def test_search_answers_501(self):
+		self.assertEqual(self.client.get('/api/posts/search/', {'q': 'post'}).status_code, 501)
@@ -13,8 +13,14 @@ urlpatterns = [
     path('me/', views.current_user, name='current-user'),
     path('change-password/', views.change_password, name='change-password'),
     path('search/', views.search_users, name='search-users'),
+    path('follows/', views.follow_status, name='follow-status'),
     path('<int:user_id>/', views.user_detail, name='user-detail'),
     path('<int:user_id>/update/', views.update_user, name='user-update'),
     path('<int:user_id>/delete/', views.delete_user, name='user-delete'),
+
+    # Social graph endpoints
+    path('<int:user_id>/follow/', views.follow_user, name='user-follow'),
+    path('<int:user_id>/followers/', views.user_followers, name='user-followers'),
+    path('<int:user_id>/following/', views.user_following, name='user-following'),
 ]
 
@@ -5,7 +5,10 @@ from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
 from src.common.exceptions import ValidationException, NotFoundException
+from src.common.middleware import query_budget
+from src.common.pagination import KeysetPagination
 from src.apps.users.services.user_service import UserService
+from src.apps.users.services.follow_service import FollowService
 from src.apps.users.schemas.user import (
     UserSerializer,
     UserUpdateSerializer,
@@ -18,10 +21,13 @@ from src.apps.users.schemas.user import (
 
 # Initialize service
 user_service = UserService()
+follow_service = FollowService()
 
 
 def get_tokens_for_user(user):
     refresh = RefreshToken.for_user(user)
+    # Copied into access tokens so WebSocket auth can skip the user lookup.
+    refresh['username'] = user.username
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
@@ -29,6 +35,7 @@ def get_tokens_for_user(user):
 
 
 
+@query_budget(3)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login(request):
@@ -56,6 +63,7 @@ def login(request):
         return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(6)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register(request):
@@ -87,6 +95,7 @@ def register(request):
         return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(6)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def logout(request):
@@ -112,6 +121,7 @@ def logout(request):
         return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(2)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def refresh_access_token(request):
@@ -140,6 +150,7 @@ def refresh_access_token(request):
 
 
 
+@query_budget(2)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_list(request):
@@ -152,6 +163,7 @@ def user_list(request):
         return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(2)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_detail(request, user_id):
@@ -165,6 +177,7 @@ def user_detail(request, user_id):
         return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(3)
 @api_view(['PUT', 'PATCH'])
 @permission_classes([IsAuthenticated])
 def update_user(request, user_id):
@@ -199,6 +212,7 @@ def update_user(request, user_id):
         return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(4)
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def delete_user(request, user_id):
@@ -223,6 +237,7 @@ def delete_user(request, user_id):
         return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(1)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def current_user(request):
@@ -230,6 +245,7 @@ def current_user(request):
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@query_budget(3)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def change_password(request):
@@ -253,6 +269,7 @@ def change_password(request):
         return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(2)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def search_users(request):
@@ -278,3 +295,83 @@ def search_users(request):
     except Exception as exc:
         return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
+
+@query_budget(5)
+@api_view(['POST', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def follow_user(request, user_id):
+    try:
+        if request.method == 'POST':
+            follow_service.follow(request.user, user_id)
+            following = True
+        else:
+            follow_service.unfollow(request.user, user_id)
+            following = False
+
+        return Response({'following': following}, status=status.HTTP_200_OK)
+
+    except NotFoundException as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_404_NOT_FOUND)
+    except ValidationException as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@query_budget(3)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def user_followers(request, user_id):
+    try:
+        paginator = KeysetPagination()
+        edges = paginator.paginate_queryset(follow_service.get_followers(user_id), request)
+        serializer = UserListSerializer([edge.follower for edge in edges], many=True)
+        return paginator.get_paginated_response(serializer.data)
+    except NotFoundException as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@query_budget(3)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def user_following(request, user_id):
+    try:
+        paginator = KeysetPagination()
+        edges = paginator.paginate_queryset(follow_service.get_following(user_id), request)
+        serializer = UserListSerializer([edge.followee for edge in edges], many=True)
+        return paginator.get_paginated_response(serializer.data)
+    except NotFoundException as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@query_budget(2)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def follow_status(request):
+    """
+    Bulk "do I follow these users" lookup: ?ids=1,2,3
+    """
+    try:
+        raw_ids = request.GET.get('ids', '')
+        user_ids = [user_id for user_id in raw_ids.split(',') if user_id.strip()]
+
+        if len(user_ids) > 100:
+            return Response(
+                {'error': 'At most 100 ids can be checked at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        following = follow_service.is_following_many(request.user, user_ids)
+        return Response(
+            {str(user_id): value for user_id, value in following.items()},
+            status=status.HTTP_200_OK
+        )
+
+    except ValueError:
+        return Response({'error': 'ids must be a comma-separated list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-18 12:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Followers'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Following'),
+        ),
+        migrations.CreateModel(
+            name='Follow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('followee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follower_edges', to=settings.AUTH_USER_MODEL)),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following_edges', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Follow',
+                'verbose_name_plural': 'Follows',
+                'db_table': 'follows',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['followee', '-created_at', '-id'], name='follow_followers_idx'), models.Index(fields=['follower', '-created_at', '-id'], name='follow_following_idx')],
+                'constraints': [models.UniqueConstraint(fields=('follower', 'followee'), name='follow_unique_edge'), models.CheckConstraint(condition=models.Q(('follower', models.F('followee')), _negated=True), name='follow_no_self')],
+            },
+        ),
+    ]
@@ -2,5 +2,6 @@
 Models package
 """
 from .user import User
+from .follow import Follow
 
-__all__ = ['User']
+__all__ = ['User', 'Follow']
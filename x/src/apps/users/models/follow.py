@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db import models
+
+
+class Follow(models.Model):
+    """Directed edge of the social graph: ``follower`` follows ``followee``."""
+
+    follower = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='following_edges',
+    )
+    followee = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='follower_edges',
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+
+    class Meta:
+        db_table = 'follows'
+        verbose_name = 'Follow'
+        verbose_name_plural = 'Follows'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'followee'], name='follow_unique_edge'),
+            models.CheckConstraint(condition=~models.Q(follower=models.F('followee')), name='follow_no_self'),
+        ]
+        indexes = [
+            models.Index(fields=['followee', '-created_at', '-id'], name='follow_followers_idx'),
+            models.Index(fields=['follower', '-created_at', '-id'], name='follow_following_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.follower_id} -> {self.followee_id}"
@@ -9,6 +9,8 @@ class User(AbstractUser):
     is_verified = models.BooleanField(default=False, verbose_name='Email Verified')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
+    follower_count = models.PositiveIntegerField(default=0, verbose_name='Followers')
+    following_count = models.PositiveIntegerField(default=0, verbose_name='Following')
 
     class Meta:
         db_table = 'users'
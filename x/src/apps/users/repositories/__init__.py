@@ -1,4 +1,5 @@
 
 from .user_repository import UserRepository
+from .follow_repository import FollowRepository
 
-__all__ = ['UserRepository']
+__all__ = ['UserRepository', 'FollowRepository']
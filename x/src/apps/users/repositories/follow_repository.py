@@ -0,0 +1,62 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, QuerySet
+from django.db.models.functions import Greatest
+from src.apps.users.models import Follow, User
+
+
+class FollowRepository:
+    @staticmethod
+    def create(follower_id: int, followee_id: int) -> bool:
+        """Insert the edge; returns ``False`` if it already existed."""
+        try:
+            with transaction.atomic():
+                Follow.objects.create(follower_id=follower_id, followee_id=followee_id)
+        except IntegrityError:
+            return False
+        return True
+
+    @staticmethod
+    def delete(follower_id: int, followee_id: int) -> bool:
+        deleted, _ = Follow.objects.filter(follower_id=follower_id, followee_id=followee_id).delete()
+        return deleted > 0
+
+    @staticmethod
+    def adjust_counts(follower_id: int, followee_id: int, delta: int) -> None:
+        User.objects.filter(id=follower_id).update(following_count=Greatest(F('following_count') + delta, 0))
+        User.objects.filter(id=followee_id).update(follower_count=Greatest(F('follower_count') + delta, 0))
+
+    @staticmethod
+    def release_counts(user_id: int) -> None:
+        """Undo ``user_id``'s edges in the counters of the other side, before the edges cascade away."""
+        User.objects.filter(
+            id__in=Follow.objects.filter(followee_id=user_id).values('follower_id')
+        ).update(following_count=Greatest(F('following_count') - 1, 0))
+        User.objects.filter(
+            id__in=Follow.objects.filter(follower_id=user_id).values('followee_id')
+        ).update(follower_count=Greatest(F('follower_count') - 1, 0))
+
+    @staticmethod
+    def followed_among(follower_id: int, user_ids) -> set[int]:
+        return set(
+            Follow.objects.filter(follower_id=follower_id, followee_id__in=user_ids)
+            .values_list('followee_id', flat=True)
+        )
+
+    @staticmethod
+    def followers_of(user_id: int) -> QuerySet[Follow]:
+        return Follow.objects.filter(followee_id=user_id).select_related('follower')
+
+    @staticmethod
+    def following_of(user_id: int) -> QuerySet[Follow]:
+        return Follow.objects.filter(follower_id=user_id).select_related('followee')
+
+    @staticmethod
+    def follower_ids(user_id: int) -> list[int]:
+        return list(Follow.objects.filter(followee_id=user_id).values_list('follower_id', flat=True))
+
+    @staticmethod
+    def followee_ids(user_id: int, min_followers: int = 0) -> list[int]:
+        qs = Follow.objects.filter(follower_id=user_id)
+        if min_followers:
+            qs = qs.filter(followee__follower_count__gt=min_followers)
+        return list(qs.values_list('followee_id', flat=True))
@@ -10,9 +10,12 @@ class UserSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name',
             'full_name','date_of_birth',
-            'is_verified', 'is_active', 'created_at', 'updated_at'
+            'is_verified', 'is_active', 'follower_count', 'following_count',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'is_verified', 'follower_count', 'following_count', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'is_verified',  'created_at', 'updated_at']
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -2,5 +2,6 @@
 Services package - Business logic layer
 """
 from .user_service import UserService
+from .follow_service import FollowService
 
-__all__ = ['UserService']
+__all__ = ['UserService', 'FollowService']
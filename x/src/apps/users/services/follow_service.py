@@ -0,0 +1,63 @@
+from django.db import transaction
+from src.apps.users.models import User
+from src.apps.users.repositories import FollowRepository, UserRepository
+from src.common.exceptions import ValidationException, NotFoundException
+
+
+class FollowService:
+    def __init__(self):
+        self.repository = FollowRepository()
+        self.user_repository = UserRepository()
+
+    def _get_user(self, user_id: int, active_only: bool = False) -> User:
+        user = self.user_repository.get_user_by_id(user_id)
+        if not user or (active_only and not user.is_active):
+            raise NotFoundException(f"User with ID {user_id} not found.")
+        return user
+
+    def _get_followee(self, follower: User, user_id: int, active_only: bool = True) -> User:
+        if follower.id == int(user_id):
+            raise ValidationException("You cannot follow yourself.")
+        return self._get_user(user_id, active_only=active_only)
+
+    @transaction.atomic
+    def follow(self, follower: User, user_id: int) -> bool:
+        """Follow ``user_id``; idempotent, returns ``True`` only when a new edge was created."""
+        followee = self._get_followee(follower, user_id)
+        created = self.repository.create(follower.id, followee.id)
+        if created:
+            self.repository.adjust_counts(follower.id, followee.id, 1)
+        return created
+
+    @transaction.atomic
+    def unfollow(self, follower: User, user_id: int) -> bool:
+        # Deactivated users can't gain followers, but existing follows must stay removable.
+        followee = self._get_followee(follower, user_id, active_only=False)
+        deleted = self.repository.delete(follower.id, followee.id)
+        if deleted:
+            self.repository.adjust_counts(follower.id, followee.id, -1)
+        return deleted
+
+    def is_following_many(self, follower: User, user_ids) -> dict[int, bool]:
+        """Answer "do I follow X" for a batch of users with a single query."""
+        user_ids = [int(user_id) for user_id in user_ids]
+        followed = self.repository.followed_among(follower.id, user_ids) if user_ids else set()
+        return {user_id: user_id in followed for user_id in user_ids}
+
+    def get_followers(self, user_id: int):
+        self._get_user(user_id)
+        return self.repository.followers_of(user_id)
+
+    def get_following(self, user_id: int):
+        self._get_user(user_id)
+        return self.repository.following_of(user_id)
+
+    def forget_user(self, user_id: int) -> None:
+        """Release the counters a user about to be deleted holds on everyone they follow or are followed by."""
+        self.repository.release_counts(user_id)
+
+    def get_follower_ids(self, user_id: int) -> list[int]:
+        return self.repository.follower_ids(user_id)
+
+    def get_followee_ids(self, user_id: int, min_followers: int = 0) -> list[int]:
+        return self.repository.followee_ids(user_id, min_followers=min_followers)
@@ -0,0 +1,11 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import User
+from .services.follow_service import FollowService
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    # Follow edges cascade without signals, so settle the counters while they still exist.
+    FollowService().forget_user(instance.pk)
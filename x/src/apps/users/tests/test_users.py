@@ -2,4 +2,3 @@
 User tests
 """
 # from django.test import TestCase
-
@@ -26,6 +26,13 @@ class ValidationException(APIException):
     default_code = 'validation_error'
 
 
+class NotImplementedException(APIException):
+    """Feature not available in this deployment"""
+    status_code = status.HTTP_501_NOT_IMPLEMENTED
+    default_detail = 'Not implemented.'
+    default_code = 'not_implemented'
+
+
 class PermissionDeniedException(APIException):
     """Permission denied exception"""
     status_code = status.HTTP_403_FORBIDDEN
@@ -0,0 +1,153 @@
+"""
+Per-request SQL instrumentation
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_WHITESPACE = re.compile(r'\s+')
+_SAVEPOINT = re.compile(r'(?:RELEASE |ROLLBACK TO )?SAVEPOINT\b', re.IGNORECASE)
+# Requests no URL pattern matched share one entry, so 404s and scanners can't grow the stats.
+UNRESOLVED_VIEW = '<unresolved>'
+
+
+def fingerprint(sql: str) -> str:
+    """Collapse parameter lists so that queries differing only in arity group together."""
+    return _WHITESPACE.sub(' ', _IN_LIST.sub('IN (...)', sql)).strip()
+
+
+def is_savepoint(sql: str) -> bool:
+    """Savepoint bookkeeping issued by nested ``atomic`` blocks, not counted as queries."""
+    return bool(_SAVEPOINT.match(sql.lstrip()))
+
+
+def query_budget(budget):
+    """
+    Declare the ``query_budget`` of a function view; apply it above ``@api_view``.
+    """
+    def decorator(view):
+        view.cls.query_budget = budget
+        return view
+    return decorator
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` hook collecting count, time and fingerprints."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        if is_savepoint(sql):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self) -> dict[str, int]:
+        return {sql: n for sql, n in self.fingerprints.items() if n > 1}
+
+
+class QueryMetrics:
+    """In-process aggregate of query stats per view, cheap enough to keep on in production."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {'requests': 0, 'queries': 0, 'sql_time': 0.0, 'max_queries': 0})
+
+    def record(self, view_name: str, recorder: QueryRecorder) -> None:
+        with self._lock:
+            stats = self._stats[view_name]
+            stats['requests'] += 1
+            stats['queries'] += recorder.count
+            stats['sql_time'] += recorder.duration
+            stats['max_queries'] = max(stats['max_queries'], recorder.count)
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+query_metrics = QueryMetrics()
+
+
+class QueryMetricsMiddleware:
+    """
+    Counts the SQL issued while handling a request.
+
+    With ``QUERY_METRICS_HEADERS`` (defaults to ``DEBUG``) the numbers are returned as
+    ``X-Query-Count``, ``X-Query-Time-Ms`` and ``X-Query-Duplicates`` response headers.
+    They are always folded into ``query_metrics``, readable by staff through
+    ``query_metrics_view``, and logged, with a warning when a view exceeds the
+    ``query_budget`` declared on it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.expose_headers = getattr(settings, 'QUERY_METRICS_HEADERS', settings.DEBUG)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        wrappers = [connections[alias].execute_wrapper(recorder) for alias in connections]
+        for wrapper in wrappers:
+            wrapper.__enter__()
+        try:
+            response = self.get_response(request)
+        finally:
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else UNRESOLVED_VIEW
+        query_metrics.record(view_name, recorder)
+
+        duplicates = recorder.duplicates
+        budget = self.get_budget(request)
+        if budget is not None and recorder.count > budget:
+            logger.warning(
+                'Query budget exceeded for %s: %d queries (budget %d)',
+                view_name, recorder.count, budget,
+            )
+        logger.debug(
+            'view=%s queries=%d sql_ms=%.1f duplicates=%d',
+            view_name, recorder.count, recorder.duration * 1000, sum(duplicates.values()),
+        )
+
+        if self.expose_headers:
+            response['X-Query-Count'] = str(recorder.count)
+            response['X-Query-Time-Ms'] = f'{recorder.duration * 1000:.1f}'
+            response['X-Query-Duplicates'] = str(sum(duplicates.values()))
+        return response
+
+    @staticmethod
+    def get_budget(request) -> int | None:
+        """Read ``query_budget`` (an int, or a dict keyed by viewset action) off the resolved view."""
+        match = getattr(request, 'resolver_match', None)
+        if not match:
+            return None
+        view_class = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+        budget = getattr(view_class, 'query_budget', None)
+        if isinstance(budget, dict):
+            actions = getattr(match.func, 'actions', None) or {}
+            action = actions.get(request.method.lower())
+            return budget.get(action)
+        return budget
@@ -0,0 +1,268 @@
+"""
+Test helpers
+"""
+import json
+import os
+import subprocess
+import sys
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from src.apps.chats.repositories.presence_store import get_presence_store
+from src.apps.chats.services.chat_service import ChatService
+from src.apps.chats.services.message_service import MessageService
+from src.apps.chats.services.storage import get_storage
+from src.apps.comments.models import Comment
+from src.apps.posts.models import Post
+from src.apps.posts.models.like import Like
+from src.apps.posts.repositories.timeline_repository import get_timeline_store
+from src.apps.users.models import Follow, User
+from src.common.middleware import fingerprint, is_savepoint
+
+
+class QueryBudgetMixin:
+    """
+    ``TestCase`` mixin asserting that code stays within a number of SQL queries.
+
+    Unlike ``assertNumQueries`` the budget is an upper bound, so an endpoint that gets
+    cheaper keeps passing while a new N+1 fails with the offending queries listed.
+    Savepoints are left out, as ``QueryMetricsMiddleware`` does, which also keeps the
+    test's own transaction from turning every ``atomic`` block into extra statements.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget: int, using: str = DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as captured:
+            yield captured
+        executed = [query['sql'] for query in captured.captured_queries if not is_savepoint(query['sql'])]
+        if len(executed) > budget:
+            queries = '\n'.join(f'{i}. {fingerprint(sql)}' for i, sql in enumerate(executed, 1))
+            self.fail(f'{len(executed)} queries executed, budget is {budget}:\n{queries}')
+
+    def assertEndpointWithinBudget(self, method: str, path: str, **kwargs):
+        """Request ``path`` through ``self.client`` and check it against the view's ``query_budget``."""
+        match = resolve(path)
+        view_class = getattr(match.func, 'cls', None)
+        budget = getattr(view_class, 'query_budget', None)
+        if isinstance(budget, dict):
+            budget = budget.get((getattr(match.func, 'actions', None) or {}).get(method.lower()))
+        if budget is None:
+            self.fail(f'{path} does not declare a query_budget for {method.upper()}')
+        with self.assertQueryBudget(budget):
+            response = getattr(self.client, method.lower())(path, **kwargs)
+        return response
+
+
+_IMPORT_PROBE = """
+import json, sys, time
+from importlib import import_module
+
+import django
+
+django.setup()
+module = sys.argv[1]
+preloaded = module in sys.modules
+start = time.perf_counter()
+import_module(module)
+elapsed = time.perf_counter() - start
+print(json.dumps({'preloaded': preloaded, 'ms': elapsed * 1000, 'modules': sorted(sys.modules)}))
+"""
+
+
+class ImportBudgetMixin:
+    """
+    ``TestCase`` mixin keeping module imports cheap, for fast worker cold starts.
+
+    The module is timed in a fresh interpreter right after ``django.setup()``, so results
+    do not depend on what the test process already loaded. A module that app loading
+    imports itself cannot be timed apart from it, and fails rather than passing at 0 ms.
+    """
+
+    def assertImportWithinBudget(self, module: str, budget_ms: float, forbidden: tuple[str, ...] = ()):
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'src.config.settings'),
+            'PYTHONPATH': os.pathsep.join(path for path in sys.path if path),
+        }
+        result = subprocess.run(
+            [sys.executable, '-c', _IMPORT_PROBE, module],
+            capture_output=True, text=True, env=env,
+        )
+        if result.returncode:
+            self.fail(f'Importing {module} failed:\n{result.stderr}')
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+
+        if probe['preloaded']:
+            self.fail(f'{module} is already imported by django.setup(), its cost is part of app loading')
+        loaded = set(probe['modules'])
+        unexpected = sorted(name for name in forbidden if name in loaded)
+        if unexpected:
+            self.fail(f'Importing {module} loaded {", ".join(unexpected)}')
+        if probe['ms'] > budget_ms:
+            self.fail(f'Importing {module} took {probe["ms"]:.1f} ms, budget is {budget_ms} ms')
+
+
+# (method, path, data, expected status, client user, PostgreSQL only)
+# ``{name}`` placeholders in paths and data are filled from ``EndpointBudgetTests.ids``.
+ENDPOINTS = [
+    # Users
+    ('post', '/api/users/auth/login/', {'username': 'alice', 'password': 'password'}, 200, None, False),
+    ('post', '/api/users/auth/register/', {
+        'username': 'dave', 'email': 'dave@example.com',
+        'password': 'correct-horse-battery', 'password_confirm': 'correct-horse-battery',
+    }, 201, None, False),
+    ('post', '/api/users/auth/logout/', {'refresh': '{refresh}'}, 200, 'alice', False),
+    ('post', '/api/users/auth/refresh/', {'refresh': '{refresh}'}, 200, None, False),
+    ('get', '/api/users/', None, 200, 'alice', False),
+    ('get', '/api/users/me/', None, 200, 'alice', False),
+    ('get', '/api/users/{bob}/', None, 200, 'alice', False),
+    ('patch', '/api/users/{alice}/update/', {'first_name': 'Alice'}, 200, 'alice', False),
+    ('delete', '/api/users/{alice}/delete/', None, 200, 'alice', False),
+    ('post', '/api/users/change-password/', {
+        'old_password': 'password',
+        'new_password': 'another-long-password', 'new_password_confirm': 'another-long-password',
+    }, 200, 'alice', False),
+    ('get', '/api/users/search/', {'q': 'user'}, 200, 'alice', False),
+    ('get', '/api/users/follows/', {'ids': '{members}'}, 200, 'alice', False),
+    ('post', '/api/users/{carol}/follow/', None, 200, 'alice', False),
+    ('delete', '/api/users/{bob}/follow/', None, 200, 'alice', False),
+    ('get', '/api/users/{alice}/followers/', None, 200, 'alice', False),
+    ('get', '/api/users/{alice}/following/', None, 200, 'alice', False),
+    # Posts
+    ('get', '/api/posts/', None, 200, 'alice', False),
+    ('get', '/api/posts/{post}/', None, 200, 'alice', False),
+    ('post', '/api/posts/', {'title': 'New', 'content': 'Post'}, 201, 'alice', False),
+    ('put', '/api/posts/{own_post}/', {'title': 'Edited', 'content': 'Post'}, 200, 'alice', False),
+    ('patch', '/api/posts/{own_post}/', {'title': 'Edited', 'content': 'Post'}, 200, 'alice', False),
+    ('delete', '/api/posts/{own_post}/', None, 204, 'alice', False),
+    ('post', '/api/posts/{post}/like/', None, 200, 'alice', True),
+    ('get', '/api/posts/{post}/likes/', None, 200, 'alice', False),
+    ('post', '/api/posts/{post}/comment/', {'content': 'Hello'}, 201, 'alice', False),
+    ('get', '/api/posts/{post}/comments/', None, 200, 'alice', False),
+    ('get', '/api/posts/timeline/', None, 200, 'alice', False),
+    ('get', '/api/posts/search/', {'q': 'searchable'}, 200, 'alice', False),
+    # Comments
+    ('get', '/api/comments/', None, 200, 'alice', False),
+    ('get', '/api/comments/{comment}/', None, 200, 'alice', False),
+    ('post', '/api/comments/', {'post': '{own_post}', 'content': 'Hello'}, 201, 'alice', False),
+    ('put', '/api/comments/{comment}/', {'post': '{own_post}', 'content': 'Edited'}, 200, 'alice', False),
+    ('patch', '/api/comments/{comment}/', {'content': 'Edited'}, 200, 'alice', False),
+    ('delete', '/api/comments/{comment}/', None, 204, 'alice', False),
+    ('delete', '/api/comments/{foreign_comment}/', None, 404, 'alice', False),
+    # Chats
+    ('get', '/api/chats/', None, 200, 'alice', False),
+    ('post', '/api/chats/', {'member_username': 'carol'}, 201, 'alice', False),
+    ('get', '/api/chats/{chat}/', None, 200, 'alice', False),
+    ('put', '/api/chats/{chat}/', {}, 200, 'alice', False),
+    ('patch', '/api/chats/{chat}/', {}, 200, 'alice', False),
+    ('delete', '/api/chats/{chat}/', None, 204, 'alice', False),
+    ('post', '/api/chats/{chat}/read/', None, 204, 'alice', False),
+    ('get', '/api/chats/presence/', {'ids': '{members}'}, 200, 'alice', False),
+    # Messages
+    ('get', '/api/chats/{chat}/messages/', None, 200, 'alice', False),
+    ('get', '/api/chats/{chat}/messages/sync/', {'since': 0}, 200, 'alice', False),
+    ('post', '/api/chats/{chat}/messages/', {'content': 'New message'}, 201, 'alice', False),
+    # Local storage has no presigned URLs.
+    ('post', '/api/chats/{chat}/attachments/', {'filename': 'photo.png'}, 400, 'alice', False),
+    ('get', '/api/messages/{message}/', {'chat_id': '{chat}'}, 200, 'alice', False),
+    ('put', '/api/messages/{message}/', {'content': 'Edited'}, 200, 'alice', False),
+    ('patch', '/api/messages/{message}/', {'content': 'Edited'}, 200, 'alice', False),
+    ('delete', '/api/messages/{message}/', None, 204, 'alice', False),
+    # Operations
+    ('get', '/api/metrics/queries/', None, 200, 'admin', False),
+    ('delete', '/api/metrics/queries/', None, 204, 'admin', False),
+]
+
+
+@override_settings(
+    TIMELINE_BACKEND='memory',
+    PRESENCE_BACKEND='memory',
+    LIKE_BUFFER_ENABLED=False,
+    ATTACHMENT_STORAGE_BACKEND='local',
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+)
+class EndpointBudgetTests(QueryBudgetMixin, APITestCase):
+    """
+    Every endpoint in ``ENDPOINTS`` stays within the ``query_budget`` it declares.
+
+    The fixture has several rows behind every list, so per-row lookups show up, and each
+    request is rolled back so the cases do not see each other's writes.
+    """
+
+    factories = (get_timeline_store, get_presence_store, get_storage)
+
+    @classmethod
+    def setUpTestData(cls):
+        users = {
+            name: User.objects.create_user(username=name, email=f'{name}@example.com', password='password')
+            for name in ('alice', 'bob', 'carol', 'user0', 'user1', 'user2')
+        }
+        users['admin'] = User.objects.create_user(
+            username='admin', email='admin@example.com', password='password', is_staff=True,
+        )
+        alice, bob = users['alice'], users['bob']
+        members = [users[f'user{i}'] for i in range(3)]
+        cls.users = users
+
+        Follow.objects.create(follower=alice, followee=bob)
+        for member in members:
+            Follow.objects.create(follower=member, followee=alice)
+            Follow.objects.create(follower=alice, followee=member)
+
+        posts = [
+            Post.objects.create(author=bob, title=f'Searchable post {i}', content='Some content')
+            for i in range(3)
+        ]
+        for post in posts:
+            for member in members:
+                Like.objects.create(post=post, user=member)
+                Comment.objects.create(post=post, author=member, content='Nice')
+        own_post = Post.objects.create(author=alice, title='Own post', content='Content')
+        comment = Comment.objects.create(post=own_post, author=alice, content='Mine')
+
+        chats = [ChatService.get_or_create_chat(alice, member) for member in members]
+        for i in range(3):
+            MessageService.send_message(user=members[0], content=f'Hi {i}', chat_id=chats[0].pk)
+        message = MessageService.send_message(user=alice, content='Hello', chat_id=chats[0].pk)
+
+        cls.ids = {
+            **{name: user.pk for name, user in users.items()},
+            'members': ','.join(str(member.pk) for member in members),
+            'post': posts[0].pk,
+            'own_post': own_post.pk,
+            'comment': comment.pk,
+            'foreign_comment': Comment.objects.filter(post=posts[0]).first().pk,
+            'chat': chats[0].pk,
+            'message': message.pk,
+            'refresh': str(RefreshToken.for_user(alice)),
+        }
+
+    def setUp(self):
+        for factory in self.factories:
+            factory.cache_clear()
+            self.addCleanup(factory.cache_clear)
+
+    def fill(self, value):
+        return value.format(**self.ids) if isinstance(value, str) else value
+
+    def test_endpoints_within_budget(self):
+        for method, path, data, expected, user, postgresql_only in ENDPOINTS:
+            with self.subTest(method=method.upper(), path=path):
+                if postgresql_only and connection.vendor != 'postgresql':
+                    self.skipTest('needs PostgreSQL')
+                cache.clear()
+                for factory in self.factories:
+                    factory.cache_clear()
+                self.client.force_authenticate(self.users[user] if user else None)
+                kwargs = {'data': {key: self.fill(value) for key, value in data.items()}} if data is not None else {}
+                with transaction.atomic():
+                    response = self.assertEndpointWithinBudget(method, self.fill(path), **kwargs)
+                    transaction.set_rollback(True)
+                self.assertEqual(response.status_code, expected, getattr(response, 'data', None))
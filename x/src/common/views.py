@@ -0,0 +1,23 @@
+"""
+Operational endpoints
+"""
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework import status
+
+from src.common.middleware import query_budget, query_metrics
+
+
+@query_budget(1)
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def query_metrics_view(request):
+    """
+    Per-view SQL stats of the worker process that serves the request, since it started
+    or since the last ``DELETE``, which resets them.
+    """
+    if request.method == 'DELETE':
+        query_metrics.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(query_metrics.snapshot(), status=status.HTTP_200_OK)
@@ -56,6 +56,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'src.common.middleware.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -66,6 +67,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Expose per-request SQL stats as X-Query-* response headers
+QUERY_METRICS_HEADERS = DEBUG
+
 ROOT_URLCONF = 'src.config.urls'
 
 TEMPLATES = [
@@ -99,6 +103,18 @@ DATABASES = {
     }
 }
 
+# Cache
+# LocMem by default (tests, local dev); point at Redis in production, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# CACHE_LOCATION=redis://127.0.0.1:6379/2
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'x-default'),
+    }
+}
+
 # SQLite fallback for development (uncomment if needed)
 # DATABASES = {
 #     'default': {
@@ -213,8 +229,11 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'if-none-match',
 ]
 
+CORS_EXPOSE_HEADERS = ['etag']
+
 CORS_ALLOW_CREDENTIALS = True
 
 ASGI_APPLICATION = 'src.config.asgi.application'
@@ -227,6 +246,60 @@ CHANNEL_LAYERS = {
         },
     },
 }
+# WebSocket auth builds the user from access-token claims without a DB hit.
+# A deactivated user keeps socket access until their access token expires.
+WS_AUTH_STATELESS = os.getenv('WS_AUTH_STATELESS', 'True') == 'True'
+# Cache lifetime of users loaded for tokens that carry no username claim
+WS_AUTH_USER_CACHE_TTL = int(os.getenv('WS_AUTH_USER_CACHE_TTL', '60'))
+
+# Batched persistence of WebSocket chat messages (per ASGI process)
+CHAT_WRITE_BATCH_SIZE = int(os.getenv('CHAT_WRITE_BATCH_SIZE', '100'))
+CHAT_WRITE_BATCH_DELAY_MS = float(os.getenv('CHAT_WRITE_BATCH_DELAY_MS', '5'))
+# Messages beyond this many pending writes are rejected with a "busy" frame
+CHAT_WRITE_QUEUE_SIZE = int(os.getenv('CHAT_WRITE_QUEUE_SIZE', '5000'))
+
+# Typing and read-receipt events
+# Minimum seconds between typing broadcasts from one connection
+CHAT_TYPING_THROTTLE = float(os.getenv('CHAT_TYPING_THROTTLE', '3'))
+# Minimum seconds between read-receipt broadcasts; the latest receipt is sent after the wait
+CHAT_READ_THROTTLE = float(os.getenv('CHAT_READ_THROTTLE', '1'))
+# Seconds between batched writes of read high-water marks
+CHAT_READ_FLUSH_INTERVAL = float(os.getenv('CHAT_READ_FLUSH_INTERVAL', '2'))
+# Chats the per-user socket joins on connect (most recent first) and at most overall
+CHAT_SOCKET_MAX_SUBSCRIPTIONS = int(os.getenv('CHAT_SOCKET_MAX_SUBSCRIPTIONS', '200'))
+
+
+# Presence of WebSocket users across ASGI workers
+# 'redis' in production, 'memory' for tests and local development
+
+PRESENCE_BACKEND = os.getenv('PRESENCE_BACKEND', 'redis')
+PRESENCE_REDIS_URL = os.getenv('PRESENCE_REDIS_URL', 'redis://127.0.0.1:6379/0')
+# A socket missing heartbeats for this many seconds counts as gone
+PRESENCE_TTL = int(os.getenv('PRESENCE_TTL', '60'))
+PRESENCE_HEARTBEAT_INTERVAL = float(os.getenv('PRESENCE_HEARTBEAT_INTERVAL', '20'))
+# Seconds between batched online/offline diffs pushed to chats
+PRESENCE_DIFF_INTERVAL = float(os.getenv('PRESENCE_DIFF_INTERVAL', '2'))
+
+
+# Home timelines (fan-out on write)
+# 'redis' in production, 'memory' for tests and local development
+
+TIMELINE_BACKEND = os.getenv('TIMELINE_BACKEND', 'redis')
+TIMELINE_REDIS_URL = os.getenv('TIMELINE_REDIS_URL', 'redis://127.0.0.1:6379/1')
+TIMELINE_MAX_LENGTH = int(os.getenv('TIMELINE_MAX_LENGTH', '800'))
+# Authors with a larger audience are merged into timelines at read time instead
+TIMELINE_FANOUT_LIMIT = int(os.getenv('TIMELINE_FANOUT_LIMIT', '10000'))
+
+
+# Write-behind like buffer
+# When enabled, like/unlike intents are coalesced per (user, post) in memory or
+# Redis and written in bulk by a flusher thread or `manage.py flush_like_buffer --loop`.
+
+LIKE_BUFFER_ENABLED = os.getenv('LIKE_BUFFER_ENABLED', 'False') == 'True'
+LIKE_BUFFER_BACKEND = os.getenv('LIKE_BUFFER_BACKEND', 'memory')
+LIKE_BUFFER_REDIS_URL = os.getenv('LIKE_BUFFER_REDIS_URL', 'redis://127.0.0.1:6379/1')
+LIKE_BUFFER_FLUSH_INTERVAL = float(os.getenv('LIKE_BUFFER_FLUSH_INTERVAL', '1.0'))
+LIKE_BUFFER_BATCH_SIZE = int(os.getenv('LIKE_BUFFER_BATCH_SIZE', '1000'))
 
 
 # AWS S3 / Cloudflare R2 Settings
@@ -236,8 +309,28 @@ R2_SECRET_ACCESS_KEY = os.getenv('R2_SECRET_ACCESS_KEY')
 R2_ENDPOINT_URL = os.getenv('R2_ENDPOINT_URL')
 R2_BUCKET_NAME = os.getenv('R2_BUCKET_NAME')
 
+# Chat attachments
+# 's3' stores them in the R2 bucket, 'local' under MEDIA_ROOT; defaults to 's3' when R2 is configured
+ATTACHMENT_STORAGE_BACKEND = os.getenv('ATTACHMENT_STORAGE_BACKEND', 's3' if R2_ENDPOINT_URL else 'local')
+# Server-side uploads are spooled to disk and streamed to the bucket by a bounded pool
+ATTACHMENT_UPLOAD_WORKERS = int(os.getenv('ATTACHMENT_UPLOAD_WORKERS', '4'))
+# Uploads accepted but not yet finished; beyond this the API answers 503
+ATTACHMENT_UPLOAD_QUEUE_SIZE = int(os.getenv('ATTACHMENT_UPLOAD_QUEUE_SIZE', '64'))
+ATTACHMENT_MULTIPART_CHUNK_SIZE = int(os.getenv('ATTACHMENT_MULTIPART_CHUNK_SIZE', str(8 * 1024 * 1024)))
+# Parts of one upload sent in parallel
+ATTACHMENT_MULTIPART_CONCURRENCY = int(os.getenv('ATTACHMENT_MULTIPART_CONCURRENCY', '4'))
+# Lifetime of presigned direct-upload URLs, in seconds
+ATTACHMENT_PRESIGN_EXPIRES = int(os.getenv('ATTACHMENT_PRESIGN_EXPIRES', '900'))
+# Image previews: long-edge sizes of the thumbnails, rendered by a process pool
+THUMBNAIL_SIZES = tuple(int(size) for size in os.getenv('THUMBNAIL_SIZES', '160,480,960').split(','))
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', '2'))
+# Seconds to wait for previews before sending the message without them
+THUMBNAIL_TIMEOUT = float(os.getenv('THUMBNAIL_TIMEOUT', '30'))
+
 # Use S3 for store mediafiles
 DEFAULT_FILE_STORAGE = "storages.backends.s3boto3.S3Boto3Storage"
 
 # Опционально: URL для доступа к файлам
-MEDIA_URL = f"https://{R2_BUCKET_NAME}.{R2_ENDPOINT_URL.split('//')[1]}/"
+# Only derived from the bucket when R2 is configured, so settings load without it.
+if R2_ENDPOINT_URL and R2_BUCKET_NAME:
+    MEDIA_URL = f"https://{R2_BUCKET_NAME}.{R2_ENDPOINT_URL.split('//', 1)[-1]}/"
@@ -17,6 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from src.common.views import query_metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api-auth/', include('rest_framework.urls')),
@@ -26,4 +28,7 @@ urlpatterns = [
     path('api/posts/', include('src.apps.posts.api.urls')),
     path('api/comments/', include('src.apps.comments.api.urls')),
     path('api/', include('src.apps.chats.api.urls')),
+
+    # Operations
+    path('api/metrics/queries/', query_metrics_view, name='query-metrics'),
 ]